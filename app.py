@@ -1,21 +1,30 @@
 # app.py
 import streamlit as st
-import pandas as pd
+
+from cube_index import CubeIndex
+from dashboard_data import load_cube_index
+from dashboard_profile import begin, loader, report, section
+from emissions_store import rollup_csv
 
 st.set_page_config(page_title="Carbon Emissions Dashboard", layout="wide")
+begin("app")
 
-@st.cache_data
-def load_data(file):
-    df = pd.read_csv(file, parse_dates=["date"])
+@st.cache_data(show_spinner=False)
+@loader
+def rollup_data(file):
+    # month x scope x category x office cube of a CSV, streamed in chunks so a
+    # full-year export never sits in memory as rows (emissions_store.rollup_csv)
     # Expect columns: date, month, scope, category, activity_amount, unit, emission_factor_kgco2e_per_unit
-    if "emissions_kgco2e" not in df.columns:
-        df["emissions_kgco2e"] = df["activity_amount"] * df["emission_factor_kgco2e_per_unit"]
-    # normalize scope labels
-    df["scope"] = df["scope"].astype(str)
-    # month key
-    if "month" not in df.columns:
-        df["month"] = df["date"].dt.strftime("%Y-%m")
-    return df
+    bar = st.progress(0.0, text="Reading CSV…")
+    cube = rollup_csv(file, progress=lambda fraction, rows: bar.progress(fraction, text=f"Reading CSV… {rows:,} rows"))
+    bar.empty()
+    return cube
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+@loader
+def index_data(file):
+    # bitmap filter index of the CSV's cube, shared by the sessions that load it
+    return CubeIndex(rollup_data(file))
 
 st.title("🌍 Total Carbon Emissions Dashboard")
 st.caption("Upload your activity data and view total emissions by month, scope, and category.")
@@ -26,35 +35,44 @@ with st.sidebar:
     st.markdown("Or try the sample file above if you don’t have one yet.")
     st.markdown("[Download sample CSV](sandbox:/mnt/data/emissions_sample.csv)")
 
-if up is not None:
-    df = load_data(up)
-else:
-    # fallback to sample (only for quick demo)
-    df = load_data("emissions_sample.csv")
+# Everything below slices the rollup cube, never the activity rows; the
+# sidebar filters run on its bitmap index (cube_index.py)
+with section("load data", cached=True):
+    if up is not None:
+        index = index_data(up)
+    else:
+        # shared cube built by import_all.py / emissions_store.py
+        index = load_cube_index()
+        if index is None:
+            # fallback to sample (only for quick demo)
+            index = index_data("emissions_sample.csv")
+    cube = index.frame
 
 # Filters
 with st.sidebar:
     st.header("🔎 Filters")
-    months = sorted(df["month"].unique())
-    scopes = sorted(df["scope"].unique())
-    categories = sorted(df["category"].unique())
+    months = index.options("month")
+    scopes = index.options("scope")
+    categories = index.options("category")
 
     sel_months = st.multiselect("Months", months, default=months)
     sel_scopes = st.multiselect("Scopes", scopes, default=scopes)
     sel_cats = st.multiselect("Categories", categories, default=categories)
 
-f = df[df["month"].isin(sel_months) & df["scope"].isin(sel_scopes) & df["category"].isin(sel_cats)]
+with section("filter"):
+    f = index.select(month=sel_months, scope=sel_scopes, category=sel_cats)
 
 # Aggregations
-total_tCO2e = f["emissions_kgco2e"].sum() / 1000
-by_scope = f.groupby("scope", as_index=False)["emissions_kgco2e"].sum()
-by_scope["tCO2e"] = by_scope["emissions_kgco2e"] / 1000
+with section("groupby"):
+    total_tCO2e = f["emissions_kgco2e"].sum() / 1000
+    by_scope = f.groupby("scope", as_index=False, observed=True)["emissions_kgco2e"].sum()
+    by_scope["tCO2e"] = by_scope["emissions_kgco2e"] / 1000
 
-by_month = f.groupby("month", as_index=False)["emissions_kgco2e"].sum()
-by_month["tCO2e"] = by_month["emissions_kgco2e"] / 1000
+    by_month = f.groupby("month", as_index=False, observed=True)["emissions_kgco2e"].sum()
+    by_month["tCO2e"] = by_month["emissions_kgco2e"] / 1000
 
-by_cat = f.groupby(["scope","category"], as_index=False)["emissions_kgco2e"].sum()
-by_cat["tCO2e"] = by_cat["emissions_kgco2e"] / 1000
+    by_cat = f.groupby(["scope","category"], as_index=False, observed=True)["emissions_kgco2e"].sum()
+    by_cat["tCO2e"] = by_cat["emissions_kgco2e"] / 1000
 
 # KPIs
 c1, c2, c3 = st.columns(3)
@@ -64,39 +82,45 @@ c3.metric("Months Covered", f"{f['month'].nunique()}")
 
 # Charts
 st.subheader("📈 Emissions Trend (Total)")
-st.line_chart(by_month.set_index("month")["tCO2e"])
+with section("trend chart"):
+    st.line_chart(by_month.set_index("month")["tCO2e"])
 
 st.subheader("📊 Emissions by Scope")
-st.bar_chart(by_scope.set_index("scope")["tCO2e"])
+with section("scope chart"):
+    st.bar_chart(by_scope.set_index("scope")["tCO2e"])
 
 st.subheader("🏷️ Emissions by Category (within scope)")
 sel_scope_for_cats = st.selectbox("Select scope", options=sorted(by_cat["scope"].unique()))
-st.bar_chart(by_cat[by_cat["scope"] == sel_scope_for_cats].set_index("category")["tCO2e"])
+with section("category chart"):
+    st.bar_chart(by_cat[by_cat["scope"] == sel_scope_for_cats].set_index("category")["tCO2e"])
 
 # Tables + Export
 st.subheader("🧾 Downloadable Tables")
-tab1, tab2, tab3 = st.tabs(["By Month", "By Scope", "By Category"])
-
-with tab1:
-    st.dataframe(by_month[["month","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"}))
-    st.download_button("Download by-month CSV",
-                       data=by_month.to_csv(index=False),
-                       file_name="emissions_by_month.csv",
-                       mime="text/csv")
-
-with tab2:
-    st.dataframe(by_scope[["scope","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"}))
-    st.download_button("Download by-scope CSV",
-                       data=by_scope.to_csv(index=False),
-                       file_name="emissions_by_scope.csv",
-                       mime="text/csv")
-
-with tab3:
-    out = by_cat[["scope","category","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"})
-    st.dataframe(out)
-    st.download_button("Download by-category CSV",
-                       data=out.to_csv(index=False),
-                       file_name="emissions_by_category.csv",
-                       mime="text/csv")
+with section("tables"):
+    tab1, tab2, tab3 = st.tabs(["By Month", "By Scope", "By Category"])
+
+    with tab1:
+        st.dataframe(by_month[["month","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"}))
+        st.download_button("Download by-month CSV",
+                           data=by_month.to_csv(index=False),
+                           file_name="emissions_by_month.csv",
+                           mime="text/csv")
+
+    with tab2:
+        st.dataframe(by_scope[["scope","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"}))
+        st.download_button("Download by-scope CSV",
+                           data=by_scope.to_csv(index=False),
+                           file_name="emissions_by_scope.csv",
+                           mime="text/csv")
+
+    with tab3:
+        out = by_cat[["scope","category","tCO2e"]].rename(columns={"tCO2e":"tCO2e_total"})
+        st.dataframe(out)
+        st.download_button("Download by-category CSV",
+                           data=out.to_csv(index=False),
+                           file_name="emissions_by_category.csv",
+                           mime="text/csv")
 
 st.caption("Tip: Replace the sample emission factors with your country/market-specific, source-of-truth values (e.g., grid EF, fuel EF).")
+
+report()
@@ -0,0 +1,301 @@
+# bench_ingest.py
+# Ingest benchmark: runs the load path stage by stage over the Data/ workbooks
+# and over synthetic copies of them with every registered table scaled up, and
+# prints one JSON line per (scale, stage) with wall time, rows, rows/sec and
+# the peak RSS of the process so far.
+#
+#   python bench_ingest.py                               # 1x, 10x, 100x on an in-memory SQLite stand-in
+#   python bench_ingest.py --scales 1 --office "Head Office"
+#   python bench_ingest.py --db mysql --database carbon_emissions_bench   # e.g. a local MySQL container
+#   python bench_ingest.py --out bench_output.txt
+#
+# Stages, timed across all workbooks of a scale:
+#   read      open the workbook and stream the registered tables (xlsx_tables.py)
+#   frame     header + rows -> DataFrame (frame_from_rows)
+#   prepare   column detection, cleaning, typing, units, month/quarter filter
+#   periods   period keys -> time_period_id (TimePeriodCache.resolve)
+#   insert    multi-row INSERTs of the resolved rows (ingest_engine.insert_batch / bulk_writer)
+#   commit
+#
+# A synthetic workbook at scale N holds the same sheets and tables as the real
+# one with the filled data rows repeated N times; they are written once with openpyxl
+# under --synthetic-dir and reused while the source workbook is unchanged.
+# Every scale runs in a fresh process against an empty database, so the peak
+# RSS and the insert times are those of that scale alone.
+import argparse
+import json
+import os
+import re
+import resource
+import sqlite3
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import mysql.connector
+from openpyxl import Workbook
+from openpyxl.worksheet.table import Table as XlTable, TableColumn
+
+from import_all import DATA_DIR, discover_workbooks
+from ingest_common import DB, TABLE_DDL, TimePeriodCache, frame_from_rows, invalidate_schema
+from ingest_engine import find_table, insert_batch, prepare, row_periods, sheet_year
+from sheet_registry import REGISTRY, db_tables
+from xlsx_tables import XlsxWorkbook
+
+SCALES = [1, 10, 100]
+SYNTHETIC_DIR = "bench_data"
+STAGES = ["read", "frame", "prepare", "periods", "insert", "commit"]
+
+# synthesize() fills in the table columns itself
+warnings.filterwarnings("ignore", "In write-only mode you must add table columns manually")
+
+TIME_PERIODS_DDL = """
+CREATE TABLE IF NOT EXISTS time_periods (
+    period_id INT AUTO_INCREMENT PRIMARY KEY,
+    year INT,
+    quarter VARCHAR(10),
+    month VARCHAR(20),
+    label VARCHAR(20)
+);"""
+
+# --- SQLite stand-in ---
+class SqliteCursor:
+    # just enough of a mysql.connector cursor for insert_batch on sqlite3:
+    # %s placeholders, AUTO_INCREMENT DDL, and the INFORMATION_SCHEMA.COLUMNS
+    # query behind ingest_common.get_pk
+    def __init__(self, conn):
+        self.cur = conn.cursor()
+        self._rows = None
+
+    @staticmethod
+    def _sql(sql):
+        sql = sql.replace("%s", "?")
+        return re.sub(r"INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+
+    def execute(self, sql, params=()):
+        if "INFORMATION_SCHEMA.COLUMNS" in sql:
+            self._rows = []
+            for table in params:
+                for _, name, data_type, _, _, pk in self.cur.execute(f"PRAGMA table_info({table})").fetchall():
+                    self._rows.append((table, name, data_type.lower(), "PRI" if pk else ""))
+            return
+        self._rows = None
+        self.cur.execute(self._sql(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq):
+        self._rows = None
+        self.cur.executemany(self._sql(sql), [tuple(p) for p in seq])
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self.cur.fetchone()
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self.cur.fetchall()
+
+    def close(self):
+        self.cur.close()
+
+def open_db(db, database=None):
+    # -> (connection, cursor) on an empty benchmark database
+    if db == "sqlite":
+        conn = sqlite3.connect(":memory:")
+        cur = SqliteCursor(conn)
+    else:
+        if not database or database == DB["database"]:
+            raise SystemExit("--db mysql needs --database naming a scratch database, not the live one")
+        conn = mysql.connector.connect(**{**DB, "database": database})
+        cur = conn.cursor()
+    invalidate_schema()
+    for table in ["time_periods"] + db_tables():
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(TIME_PERIODS_DDL)
+    for table in db_tables():
+        cur.execute(TABLE_DDL[table])
+    conn.commit()
+    return conn, cur
+
+# --- synthetic workbooks ---
+def registered_tables(wb, years):
+    # (entry, year, Table) for every registered table of an open XlsxWorkbook
+    for entry in REGISTRY:
+        for title, tables in wb.sheets.items():
+            if not title.startswith(entry["sheet"]):
+                continue
+            year = sheet_year(title, years)
+            table_name = find_table(tables, entry["table"])
+            if year is not None and table_name is not None:
+                yield entry, year, tables[table_name]
+
+def synthesize(path, years, scale, out_path):
+    # copy of the workbook's registered tables with the data rows repeated scale times
+    out = Workbook(write_only=True)
+    with XlsxWorkbook(path) as wb:
+        for title, tables in wb.sheets.items():
+            found = [t for _, _, t in registered_tables(wb, years) if t.sheet == title]
+            if not found:
+                continue
+            ws = out.create_sheet(title)
+            row = 1
+            for t in dict.fromkeys(found):
+                header, *data = wb.iter_rows(t)
+                filled = [r for r in data if any(c not in (None, "") for c in r)]
+                blank = len(data) - len(filled)   # template rows are kept once
+                ws.append(header)
+                for _ in range(scale):
+                    for r in filled:
+                        ws.append(r)
+                for _ in range(blank):
+                    ws.append([None] * len(header))
+                last = row + len(filled) * scale + blank
+                ref = f"A{row}:{_col_letter(len(header))}{max(last, row + 1)}"
+                table = XlTable(displayName=t.name, ref=ref)
+                table.tableColumns = [TableColumn(id=i + 1, name=str(h) if h is not None else f"Column{i + 1}")
+                                      for i, h in enumerate(header)]
+                ws.add_table(table)
+                ws.append([])
+                row = last + 2
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp = out_path + ".tmp"
+    out.save(tmp)
+    os.replace(tmp, out_path)
+
+def _col_letter(n):
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def workbooks_at(scale, workbooks, data_dir, synthetic_dir):
+    # (path, years) of the workbooks to load at this scale, writing missing
+    # or outdated synthetic copies first
+    if scale == 1:
+        return [(path, years) for path, _, years in workbooks]
+    out = []
+    for path, _, years in workbooks:
+        rel = os.path.splitext(os.path.relpath(path, data_dir))[0] + ".xlsx"
+        target = os.path.join(synthetic_dir, f"x{scale}", rel)
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+            synthesize(path, years, scale, target)
+        out.append((target, years))
+    return out
+
+# --- benchmark ---
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_scale(scale, workbooks, db, database=None, chunk_size=1000):
+    # one scale in this process; returns a result dict per stage and one for the total
+    conn, cur = open_db(db, database)
+    seconds = dict.fromkeys(STAGES, 0.0)
+    rows = dict.fromkeys(STAGES, 0)
+    peak = {}
+    tp_cache = TimePeriodCache(cur)
+    nbytes = 0
+    skipped = []   # tables prepare() rejected
+
+    def timed(stage, fn, *a, **k):
+        start = time.perf_counter()
+        result = fn(*a, **k)
+        seconds[stage] += time.perf_counter() - start
+        peak[stage] = peak_rss_mb()
+        return result
+
+    for path, years in workbooks:
+        nbytes += os.path.getsize(path)
+        wb = timed("read", XlsxWorkbook, path)
+        with wb:
+            for entry, year, table in list(registered_tables(wb, years)):
+                raw = timed("read", list, wb.iter_rows(table))
+                rows["read"] += len(raw) - 1
+                df = timed("frame", frame_from_rows, raw)
+                rows["frame"] += len(df)
+                if df.empty:
+                    continue
+
+                def prepared():
+                    out = prepare(entry, df)
+                    return out[row_periods(entry, out, year).notna()] if entry["period"] else out
+                try:
+                    df = timed("prepare", prepared)
+                except ValueError as e:
+                    # a table without its required columns: the benchmark goes on
+                    # without it, while import_all fails the whole workbook
+                    print(f"⚠️  {os.path.basename(path)} / {table.name}: {e}; not benchmarked", file=sys.stderr)
+                    skipped.append(f"{os.path.basename(path)} / {table.name}")
+                    continue
+                rows["prepare"] += len(df)
+                if df.empty:
+                    continue
+                period = year
+                if entry["period"]:
+                    period = timed("periods", tp_cache.resolve, cur, row_periods(entry, df, year))
+                    rows["periods"] += len(df)
+                # office / category ids are constants here: the benchmark
+                # database has no offices or categories tables
+                rows["insert"] += timed("insert", insert_batch, cur, entry, df, 1, period, 1,
+                                        chunk_size=chunk_size)
+    timed("commit", conn.commit)
+    rows["commit"] = rows["insert"]
+    cur.close()
+    conn.close()
+
+    results = []
+    for stage in STAGES:
+        results.append({"scale": scale, "stage": stage, "seconds": round(seconds[stage], 4),
+                        "rows": rows[stage], "peak_rss_mb": peak.get(stage)})
+    total = sum(seconds.values())
+    results.append({"scale": scale, "stage": "total", "seconds": round(total, 4), "rows": rows["insert"],
+                    "workbooks": len(workbooks), "bytes_read": nbytes, "skipped_tables": len(skipped),
+                    "peak_rss_mb": peak_rss_mb()})
+    for r in results:
+        r["rows_per_sec"] = round(r["rows"] / r["seconds"]) if r["seconds"] and r["stage"] != "commit" else None
+        r["db"] = db
+    return results
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the ingest path over Data/ and scaled-up copies of it.")
+    ap.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    ap.add_argument("--office", help="only this office's workbooks (folder or office name)")
+    ap.add_argument("--scales", default=",".join(map(str, SCALES)),
+                    help="comma-separated row multipliers (default: 1,10,100)")
+    ap.add_argument("--db", choices=["sqlite", "mysql"], default="sqlite",
+                    help="in-memory SQLite stand-in, or MySQL with ingest_common.DB's credentials")
+    ap.add_argument("--database", help="with --db mysql: scratch database to load into (tables are dropped)")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="rows per multi-row INSERT")
+    ap.add_argument("--synthetic-dir", default=SYNTHETIC_DIR, help="where the scaled-up workbooks are kept")
+    ap.add_argument("--out", help="also append the JSON lines to this file")
+    args = ap.parse_args(argv)
+    scales = [int(s) for s in args.scales.split(",")]
+    workbooks = list(discover_workbooks(args.data_dir, args.office))
+    if not workbooks:
+        raise SystemExit(f"No workbooks found under {args.data_dir}")
+
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    try:
+        for scale in scales:
+            todo = workbooks_at(scale, workbooks, args.data_dir, args.synthetic_dir)
+            # a fresh process per scale keeps peak RSS per scale
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results = pool.submit(run_scale, scale, todo, args.db, args.database, args.chunk_size).result()
+            for r in results:
+                line = json.dumps(r)
+                print(line, flush=True)
+                if out:
+                    out.write(line + "\n")
+    finally:
+        if out:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# bulk_writer.py
+# One insert path for every importer: rows go out as multi-row
+#   INSERT INTO t (a,b,...) VALUES (...),(...),...
+# statements of chunk_size rows each, or, for large backfills, through
+# LOAD DATA LOCAL INFILE from a temporary tab-separated file.
+#
+# With key_columns the rows are upserted (INSERT ... ON DUPLICATE KEY UPDATE)
+# instead, which needs the matching unique key, see ingest_common.ensure_unique_key.
+#
+# LOAD DATA LOCAL needs local_infile=ON on the server and a connection opened
+# with allow_local_infile=True (ingest_common.connect(local_infile=True)).
+import os
+import tempfile
+
+CHUNK_SIZE = 1000          # rows per INSERT statement
+INFILE_MIN_ROWS = 5000     # below this a LOAD DATA round trip is not worth the temp file
+
+def quote_ident(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+def _insert_prefix(table, columns):
+    return f"INSERT INTO {quote_ident(table)} ({','.join(quote_ident(c) for c in columns)}) VALUES "
+
+def bulk_insert(cursor, table, columns, rows, chunk_size=CHUNK_SIZE, suffix=""):
+    # rows: iterable of tuples in column order; returns the number of rows sent
+    prefix = _insert_prefix(table, columns)
+    group = "(" + ",".join(["%s"] * len(columns)) + ")"
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            total += _send(cursor, prefix, group, chunk, suffix)
+            chunk = []
+    if chunk:
+        total += _send(cursor, prefix, group, chunk, suffix)
+    return total
+
+def bulk_upsert(cursor, table, columns, rows, key_columns, chunk_size=CHUNK_SIZE):
+    # multi-row INSERT ... ON DUPLICATE KEY UPDATE on the table's unique key;
+    # MySQL leaves rows whose values did not change untouched
+    updates = [c for c in columns if c not in key_columns]
+    suffix = " ON DUPLICATE KEY UPDATE " + ",".join(
+        f"{quote_ident(c)}=VALUES({quote_ident(c)})" for c in updates)
+    return bulk_insert(cursor, table, columns, rows, chunk_size, suffix)
+
+def _send(cursor, prefix, group, chunk, suffix=""):
+    params = [v for row in chunk for v in row]
+    cursor.execute(prefix + ",".join([group] * len(chunk)) + suffix, params)
+    return len(chunk)
+
+def _tsv_field(v):
+    if v is None:
+        return "\\N"
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    return (str(v).replace("\\", "\\\\").replace("\t", "\\t")
+                  .replace("\n", "\\n").replace("\r", "\\r"))
+
+def load_data_infile(cursor, table, columns, rows):
+    # streams rows through a temp file + LOAD DATA LOCAL INFILE; returns rows written
+    n = 0
+    fd, path = tempfile.mkstemp(suffix=".tsv", prefix=f"{table}_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            for row in rows:
+                f.write("\t".join(_tsv_field(v) for v in row) + "\n")
+                n += 1
+        if n:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {quote_ident(table)} CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({','.join(quote_ident(c) for c in columns)})", (path,))
+    finally:
+        os.remove(path)
+    return n
+
+def write_rows(cursor, table, columns, rows, chunk_size=CHUNK_SIZE, local_infile=False, key_columns=None):
+    # entry point used by the importers: upsert on key_columns when given, else
+    # LOAD DATA for big batches when enabled, multi-row INSERTs otherwise
+    rows = rows if isinstance(rows, list) else list(rows)
+    if key_columns:
+        return bulk_upsert(cursor, table, columns, rows, key_columns, chunk_size)
+    if local_infile and len(rows) >= INFILE_MIN_ROWS:
+        return load_data_infile(cursor, table, columns, rows)
+    return bulk_insert(cursor, table, columns, rows, chunk_size)
@@ -0,0 +1,72 @@
+# cube_index.py
+# Bitmap index over the rollup cube's dimensions for the dashboard filters.
+#
+# Built once per cube: each dimension column (month, scope, category, office)
+# is encoded to integer codes and every distinct value gets a bitmap of the
+# rows holding it, packed 8 rows to a byte. A filter is then bitwise work on
+# those bitmaps instead of string comparisons on the columns:
+#
+#   index = CubeIndex(cube)
+#   f = index.select(month=sel_months, scope=sel_scopes)   # rows of cube
+#
+# Within a dimension the selected values are OR-ed (or, when most of them are
+# selected, the unselected ones OR-ed and masked out); across dimensions the
+# results are AND-ed, and a dimension with everything selected costs nothing.
+# As with isin(), rows with no value in a filtered dimension never match.
+import numpy as np
+import pandas as pd
+
+from emissions_store import CUBE_DIMENSIONS
+
+class CubeIndex:
+    def __init__(self, frame, dimensions=CUBE_DIMENSIONS):
+        self.frame = frame
+        self.n = len(frame)
+        self.values = {}    # dimension -> sorted distinct values
+        self.position = {}  # dimension -> {value: row in bitmaps}
+        self.bitmaps = {}   # dimension -> uint8 array (values x packed rows)
+        self.present = {}   # dimension -> packed bitmap of rows with a value
+        rows = np.arange(self.n)
+        for dim in dimensions:
+            if dim not in frame:
+                continue
+            codes, uniques = pd.factorize(frame[dim], sort=True)
+            has = codes >= 0
+            one_hot = np.zeros((len(uniques), self.n), dtype=bool)
+            one_hot[codes[has], rows[has]] = True
+            self.values[dim] = list(np.asarray(uniques))
+            self.position[dim] = {v: i for i, v in enumerate(self.values[dim])}
+            self.bitmaps[dim] = np.packbits(one_hot, axis=1)
+            self.present[dim] = np.packbits(has)
+
+    def options(self, dim):
+        return self.values.get(dim, [])
+
+    def _bits(self, dim, selected):
+        # packed bitmap of the rows whose dim is one of selected
+        pos = {self.position[dim][v] for v in selected if v in self.position[dim]}
+        bitmaps = self.bitmaps[dim]
+        if len(pos) == len(bitmaps):
+            return self.present[dim]   # everything selected: only missing values drop out
+        if len(pos) > len(bitmaps) // 2:
+            rest = [i for i in range(len(bitmaps)) if i not in pos]
+            return self.present[dim] & ~np.bitwise_or.reduce(bitmaps[rest], axis=0)
+        if not pos:
+            return np.zeros(bitmaps.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(bitmaps[sorted(pos)], axis=0)
+
+    def mask(self, **selections):
+        # boolean row mask for {dimension: selected values}; dimensions not
+        # given (or not indexed) are not filtered
+        bits = None
+        for dim, selected in selections.items():
+            if dim not in self.bitmaps:
+                continue
+            b = self._bits(dim, selected)
+            bits = b if bits is None else bits & b
+        if bits is None:
+            return np.ones(self.n, dtype=bool)
+        return np.unpackbits(bits, count=self.n).astype(bool)
+
+    def select(self, **selections):
+        return self.frame[self.mask(**selections)]
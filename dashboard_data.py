@@ -0,0 +1,46 @@
+# dashboard_data.py
+# Streamlit-side access to the shared emissions store and its rollup cube
+# (emissions_store.py).
+#
+# Each mapped table is a cache_resource: one DataFrame per process, shared by
+# every session, instead of a copy per session from cache_data. The file's
+# mtime is part of the cache key, so a rebuild by import_all.py is picked up
+# on the next rerun without restarting the app. The cube also comes with its
+# bitmap filter index (cube_index.py), built once per cube file.
+import os
+
+import streamlit as st
+
+from cube_index import CubeIndex
+from dashboard_profile import loader
+from emissions_store import CUBE_PATH, STORE_PATH, read_frame
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+@loader
+def _open(path, mtime_ns):
+    return read_frame(path)
+
+def load_emissions(path=STORE_PATH):
+    # store contents as a DataFrame (treat as read-only), None if not built yet
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _open(path, mtime_ns)
+
+def load_cube(path=CUBE_PATH):
+    # month x scope x category x office rollup, same contract as load_emissions
+    return load_emissions(path)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+@loader
+def _index(path, mtime_ns):
+    return CubeIndex(_open(path, mtime_ns))
+
+def load_cube_index(path=CUBE_PATH):
+    # CubeIndex of the cube (its .frame is load_cube()), None if not built yet
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _index(path, mtime_ns)
@@ -0,0 +1,96 @@
+# dashboard_profile.py
+# Opt-in render profiling for the Streamlit dashboards.
+#
+# Turned on for every session with DASHBOARD_PROFILE=1 in the environment, or
+# for one browser tab with ?profile=1 in the URL. A page calls begin() first
+# and report() last, and wraps its steps in
+#
+#   with section("treemap"):
+#       fig = px.treemap(...)
+#       st.plotly_chart(fig)
+#
+# Loaders behind st.cache_data / st.cache_resource are decorated with
+# @loader (below the cache decorator, so it only runs on a miss); a section
+# opened with cached=True then reports whether any of them had to run.
+#
+# report() shows the rerun's sections in a sidebar panel and appends them as
+# one JSON line (page, session, time, ms per section, cache hit/miss) to
+# DASHBOARD_PROFILE_LOG (default dashboard_profile.log), so reruns of many
+# concurrent sessions can be compared afterwards. Without profiling every
+# call here is a no-op.
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+LOG_PATH = os.environ.get("DASHBOARD_PROFILE_LOG", "dashboard_profile.log")
+
+_local = threading.local()   # Streamlit runs each session's script on its own thread
+_log_lock = threading.Lock()
+
+def enabled():
+    return os.environ.get("DASHBOARD_PROFILE") == "1" or st.query_params.get("profile") == "1"
+
+def current():
+    return getattr(_local, "profile", None)
+
+def begin(page):
+    # starts this rerun's profile; call before anything else on the page
+    _local.profile = None
+    if enabled():
+        _local.profile = {"page": page, "start": time.perf_counter(), "sections": [], "misses": 0}
+
+@contextlib.contextmanager
+def section(name, cached=False):
+    # times the block; cached=True also records "miss" if a @loader ran inside it, else "hit"
+    profile = current()
+    if profile is None:
+        yield
+        return
+    misses = profile["misses"]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = {"section": name, "ms": round((time.perf_counter() - start) * 1000, 2)}
+        if cached:
+            entry["cache"] = "miss" if profile["misses"] > misses else "hit"
+        profile["sections"].append(entry)
+
+def loader(fn):
+    # put under @st.cache_data / @st.cache_resource: the body only runs on a miss
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = current()
+        if profile is not None:
+            profile["misses"] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+def _log(record):
+    line = json.dumps(record)
+    with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+def report():
+    # sidebar panel and log line for this rerun; call at the end of the page
+    profile = current()
+    if profile is None:
+        return
+    _local.profile = None
+    total = round((time.perf_counter() - profile["start"]) * 1000, 2)
+    ctx = get_script_run_ctx()
+    _log({"page": profile["page"], "session": ctx.session_id if ctx else None,
+          "at": datetime.datetime.now().isoformat(timespec="milliseconds"),
+          "total_ms": total, "sections": profile["sections"]})
+    with st.sidebar.expander(f"⏱️ Profile: {total:,.0f} ms", expanded=False):
+        df = pd.DataFrame(profile["sections"], columns=["section", "ms", "cache"])
+        st.dataframe(df.sort_values("ms", ascending=False), hide_index=True)
+        st.caption(f"Logged to {LOG_PATH}")
@@ -0,0 +1,199 @@
+# emissions_engine.py
+# kgCO2e for every activity row in the DB, from the workbooks' Emission_Factors
+# sheet.
+#
+# The factor block at the top of Emission_Factors (Fuel Type (VLOOKUP) /
+# Category / Energy Source / Unit / Emission Factor) is read from each branch
+# workbook once per run into one lookup indexed by (source, unit, year).
+# Sources are matched on letters and digits only, so "R-410a" finds R410A;
+# rows without a Fuel Type use their Energy Source. Factors and activity
+# amounts are both brought to the base unit of their dimension (units.py), so
+# a factor per m3 applies to litres and the other way round. Every activity table in
+# ACTIVITIES is then pulled with one SELECT, stacked into one frame, joined to
+# the lookup and multiplied in a single pass, and the result replaces the
+# contents of the emissions table with bulk inserts.
+#
+# Rows whose (source, unit, year) has no factor are still written, with NULL
+# factor and kgco2e, and counted in the run summary.
+#
+#   python emissions_engine.py            # recompute from the DB and Data/
+import argparse
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import CHUNK_SIZE, write_rows
+from ingest_common import column_finder, connect, frame_from_rows, get_pk, invalidate_schema, nullify
+from units import to_base
+from xlsx_tables import XlsxWorkbook
+
+FACTOR_SHEET = "Emission_Factors"
+FACTOR_RANGE = "A1:F60"   # the factor block ends at the first blank row
+FACTOR_COLUMNS = ["source", "unit", "factor", "year"]
+
+EMISSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS emissions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    source_table VARCHAR(30) NOT NULL,
+    source_id INT NOT NULL,
+    office_id INT,
+    time_period_id INT,
+    category_id INT,
+    scope TINYINT,
+    source VARCHAR(150),
+    activity_amount DECIMAL(14,4),
+    unit VARCHAR(20),
+    emission_factor DECIMAL(14,6),
+    kgco2e DECIMAL(16,4),
+    UNIQUE KEY uq_emissions_source (source_table, source_id)
+);"""
+
+EMISSION_COLUMNS = ["source_table", "source_id", "office_id", "time_period_id", "category_id", "scope",
+                    "source", "activity_amount", "unit", "emission_factor", "kgco2e"]
+
+def refrigerant_kg(df):
+    # simplified mass balance: charge beyond nameplate on new units, recharges,
+    # and the capacity not recovered from disposed units
+    status = df["equipment_status"].astype("string").str.strip().str.lower()
+    charge, capacity, recharge, recovered = (pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+                                             for c in ("charge_kg", "capacity_kg", "recharge_kg", "recovered_kg"))
+    new = np.where(status == "new installation", (charge - capacity).clip(lower=0), 0.0)
+    disposed = np.where(status == "disposed", (capacity - recovered).clip(lower=0), 0.0)
+    return recharge + new + disposed
+
+# activity tables: source / unit are a column, or a constant in quotes;
+# amount is a column or a function of the selected columns
+ACTIVITIES = [
+    {"table": "fuel_buildings", "scope": 1, "source": "fuel_type", "unit": "unit", "amount": "consumption"},
+    {"table": "fuel_vehicles", "scope": 1, "source": "fuel_type", "unit": "unit", "amount": "consumption"},
+    {"table": "electricity", "scope": 2, "source": "'Electricity'", "unit": "'kWh'", "amount": "consumption_kwh"},
+    {"table": "refrigerants", "scope": 1, "source": "refrigerant", "unit": "'kg'", "amount": refrigerant_kg,
+     "columns": ["equipment_status", "charge_kg", "capacity_kg", "recharge_kg", "recovered_kg"]},
+    {"table": "waste", "scope": 3, "source": "waste_composition", "unit": "'kg'", "amount": "weight_kg"},
+]
+
+def source_key(s):
+    return s.astype("string").str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+
+
+# --- factors ---
+def read_factors(path, years):
+    # factor rows of one workbook, once per reporting year it covers
+    with XlsxWorkbook(path) as wb:
+        if FACTOR_SHEET not in wb.sheet_parts:
+            return pd.DataFrame(columns=FACTOR_COLUMNS)
+        rows = wb.iter_rows(wb.range_table(FACTOR_SHEET, FACTOR_RANGE))
+        df = frame_from_rows(itertools.takewhile(lambda r: any(v is not None for v in r), rows))
+    fc = column_finder(df.columns)
+    fuel, energy = fc("Fuel Type (VLOOKUP)", "Fuel Type"), fc("Energy Source")
+    unit, factor = fc("Unit"), fc("Emission Factor (kg CO2e per unit)", "Emission Factor")
+    if df.empty or None in (unit, factor) or (fuel is None and energy is None):
+        return pd.DataFrame(columns=FACTOR_COLUMNS)
+    source = df[fuel] if fuel is not None else pd.Series(None, index=df.index, dtype=object)
+    if energy is not None:
+        source = source.where(source.notna(), df[energy])
+    out = pd.DataFrame({"source": source, "unit": df[unit],
+                        "factor": pd.to_numeric(df[factor], errors="coerce")})
+    out = out[out["source"].notna() & out["factor"].notna()]
+    return pd.concat([out.assign(year=y) for y in years], ignore_index=True)[FACTOR_COLUMNS]
+
+def load_factors(workbooks):
+    # workbooks: (path, years); -> factor Series indexed by (source key, unit key, year).
+    # A factor that differs between branches for the same year keeps the first value
+    frames = [f for f in (read_factors(path, years) for path, years in workbooks) if not f.empty]
+    factors = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FACTOR_COLUMNS)
+    factors["source_key"] = source_key(factors["source"])
+    # factor per base unit: divide by the number of base units in one unit
+    per_unit, factors["unit_key"] = to_base(pd.Series(1.0, index=factors.index), factors["unit"])
+    factors["factor"] = pd.to_numeric(factors["factor"]) / per_unit
+    keys = ["source_key", "unit_key", "year"]
+    distinct = factors.drop_duplicates(keys + ["factor"])
+    conflicts = distinct[distinct.duplicated(keys)]
+    if not conflicts.empty:
+        print(f"⚠️  {len(conflicts)} emission factors differ between workbooks, first one kept: "
+              f"{sorted(set(conflicts['source']))}")
+    return distinct.drop_duplicates(keys).set_index(keys)["factor"].sort_index()
+
+# --- activity ---
+def _select(expr):
+    return expr if expr.startswith("'") else f"t.{expr}"
+
+def read_activity(cursor, activities=ACTIVITIES):
+    # one frame of every activity row: source_table, source_id, ids, year,
+    # source, unit, activity_amount
+    tp_pk = get_pk(cursor, "time_periods") or "time_period_id"
+    frames = []
+    for spec in activities:
+        pk = get_pk(cursor, spec["table"])
+        if pk is None:   # table not created yet
+            continue
+        amount = spec["amount"]
+        extra = spec.get("columns", []) if callable(amount) else [amount]
+        cursor.execute(
+            f"SELECT t.{pk}, t.office_id, t.time_period_id, t.category_id, tp.year, "
+            f"{_select(spec['source'])}, {_select(spec['unit'])}"
+            + "".join(f", t.{c}" for c in extra) +
+            f" FROM {spec['table']} t LEFT JOIN time_periods tp ON t.time_period_id = tp.{tp_pk}")
+        df = pd.DataFrame(cursor.fetchall(), columns=["source_id", "office_id", "time_period_id", "category_id",
+                                                      "year", "source", "unit"] + extra)
+        df["activity_amount"] = amount(df) if callable(amount) else pd.to_numeric(df[amount], errors="coerce")
+        df["source_table"] = spec["table"]
+        df["scope"] = spec["scope"]
+        frames.append(df.drop(columns=extra))
+    if not frames:
+        return pd.DataFrame(columns=["source_id", "office_id", "time_period_id", "category_id", "year",
+                                     "source", "unit", "activity_amount", "source_table", "scope"])
+    return pd.concat(frames, ignore_index=True)
+
+def compute(activity, factors):
+    # one unit conversion, one merge and one multiply for all tables
+    amount, unit = to_base(activity["activity_amount"], activity["unit"])
+    activity = activity.assign(activity_amount=amount, unit=unit, unit_key=unit,
+                               source_key=source_key(activity["source"]),
+                               year=pd.to_numeric(activity["year"], errors="coerce").astype("Int64"))
+    out = activity.join(factors.rename("emission_factor"), on=["source_key", "unit_key", "year"])
+    out["kgco2e"] = out["activity_amount"] * out["emission_factor"]
+    return out
+
+def write_emissions(cursor, df, chunk_size=CHUNK_SIZE, local_infile=False):
+    # replaces the emissions table; the caller commits
+    cursor.execute(EMISSIONS_DDL)
+    invalidate_schema("emissions")
+    cursor.execute("DELETE FROM emissions")
+    rows = nullify(df[EMISSION_COLUMNS]).itertuples(index=False, name=None)
+    return write_rows(cursor, "emissions", EMISSION_COLUMNS, rows, chunk_size=chunk_size, local_infile=local_infile)
+
+def run(cursor, workbooks, chunk_size=CHUNK_SIZE, local_infile=False):
+    # workbooks: (path, years) to read factors from; returns (rows written,
+    # rows without a factor)
+    factors = load_factors(workbooks)
+    df = compute(read_activity(cursor), factors)
+    missing = df[df["emission_factor"].isna()]
+    if not missing.empty:
+        counts = missing.groupby(["source_table", "source", "unit"], dropna=False).size()
+        print(f"⚠️  {len(missing)} activity rows have no emission factor:")
+        for (table, source, unit), n in counts.items():
+            print(f"     {table}: {source} [{unit}] x{n}")
+    return write_emissions(cursor, df, chunk_size, local_infile), len(missing)
+
+def main(argv=None):
+    from import_all import DATA_DIR, discover_workbooks
+    ap = argparse.ArgumentParser(description="Recompute the emissions table from the activity tables.")
+    ap.add_argument("data_dir", nargs="?", default=DATA_DIR, help="workbooks to read Emission_Factors from")
+    args = ap.parse_args(argv)
+    workbooks = [(path, years) for path, office, years in discover_workbooks(args.data_dir)]
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        n, missing = run(cur, workbooks)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    print(f"🧮 emissions: {n} rows ({missing} without a factor)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
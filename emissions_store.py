@@ -0,0 +1,267 @@
+# emissions_store.py
+# Shared emissions table behind the dashboards (app.py, scrollytelling*.py,
+# emissions.qmd).
+#
+# One uncompressed Arrow IPC file, store/emissions.arrow, in the dashboards'
+# record layout (STORE_SCHEMA: the columns of emissions_sample.csv plus office
+# and co2_tonnes). Readers memory-map it, so every Streamlit session and process
+# on the host shares the same page-cached copy instead of each parsing a CSV
+# or pulling the DB view into its own DataFrame; see dashboard_data.py.
+#
+# import_all.py rebuilds it after each load from the emissions table written by
+# emissions_engine.py (v_fuel_buildings_emissions on databases without one).
+# It can also be built by hand:
+#   python emissions_store.py                       # from the DB
+#   python emissions_store.py emissions_sample.csv  # from a CSV in the sample layout
+#
+# Next to it, store/cube.arrow is the rollup the dashboards actually chart:
+# emissions_kgco2e summed per (month, scope, category, office), with the number
+# of source rows. It is rebuilt with the store, so KPIs and charts slice a few
+# hundred cube rows whatever the number of activity rows.
+#
+# Writers replace the files atomically, so open readers keep their old mapping
+# until they reopen.
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
+STORE_PATH = os.path.join(STORE_DIR, "emissions.arrow")
+CUBE_PATH = os.path.join(STORE_DIR, "cube.arrow")
+CUBE_DIMENSIONS = ["month", "scope", "category", "office"]
+CHUNK_ROWS = 100_000   # CSV rows parsed at a time by rollup_csv
+
+# strings are dictionary-encoded with sorted, ordered dictionaries: they load
+# as ordered pandas categoricals (plotly's hierarchy charts take max() of them)
+DICT = pa.dictionary(pa.int32(), pa.string(), ordered=True)
+STORE_SCHEMA = pa.schema([
+    ("date", pa.timestamp("ns")),
+    ("month", DICT),
+    ("office", DICT),
+    ("scope", DICT),
+    ("category", DICT),
+    ("activity_amount", pa.float32()),
+    ("unit", DICT),
+    ("emission_factor_kgco2e_per_unit", pa.float32()),
+    ("notes", pa.string()),
+    ("emissions_kgco2e", pa.float64()),
+    ("co2_tonnes", pa.float64()),
+])
+
+# the same layout for frames built in pandas (CSV uploads, staged tables):
+# low-cardinality labels as ordered categoricals, activity quantities as
+# float32; emissions and tonnes stay float64 since they are what gets summed
+CATEGORICAL = ["month", "office", "scope", "category", "unit",
+               "facility_type", "fuel_type", "vehicle_type", "utility_provider"]
+FLOAT32 = ["activity_amount", "emission_factor_kgco2e_per_unit", "consumption", "consumption_kwh", "cost_php"]
+
+def typed(df):
+    # df with the columns above converted in place where present; call it after
+    # deriving emissions_kgco2e so the product is taken at full width
+    for c in CATEGORICAL:
+        if c in df and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = pd.Categorical(df[c].astype("string"), ordered=True)
+    for c in FLOAT32:
+        if c in df:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float32")
+    return df
+
+def to_table(df):
+    # DataFrame in (a subset of) the store layout -> Arrow table with STORE_SCHEMA;
+    # emissions, month and tonnes are derived where missing, as the dashboards did
+    df = df.copy()
+    if "emissions_kgco2e" not in df:
+        if "co2_tonnes" in df:
+            df["emissions_kgco2e"] = df["co2_tonnes"] * 1000
+        else:
+            df["emissions_kgco2e"] = df["activity_amount"] * df["emission_factor_kgco2e_per_unit"]
+    if "co2_tonnes" not in df:
+        df["co2_tonnes"] = df["emissions_kgco2e"] / 1000
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"])
+    if ("month" not in df or df["month"].isna().all()) and "date" in df:
+        df["month"] = df["date"].dt.strftime("%Y-%m")
+    if "date" not in df and "month" in df:
+        # quarter-only periods have no label, hence no date
+        df["date"] = pd.to_datetime(df["month"].astype("string") + "-01", errors="coerce")
+    columns = []
+    for field in STORE_SCHEMA:
+        if field.name not in df:
+            columns.append(pa.nulls(len(df), field.type))
+            continue
+        values = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            values = pd.Categorical(values.astype("string"), ordered=True)
+        elif pa.types.is_string(field.type):
+            values = values.astype("string")
+        columns.append(pa.array(values, from_pandas=True).cast(field.type))
+    return pa.Table.from_arrays(columns, schema=STORE_SCHEMA)
+
+def build_cube(table):
+    # store table -> rollup table: one row per CUBE_DIMENSIONS combination present
+    cube = table.group_by(CUBE_DIMENSIONS).aggregate([("emissions_kgco2e", "sum"),
+                                                      ("emissions_kgco2e", "count", pc.CountOptions("all"))])
+    return cube.rename_columns(CUBE_DIMENSIONS + ["emissions_kgco2e", "rows"])
+
+def rollup(df):
+    # the cube of a DataFrame in the store layout, for data that is not in the
+    # store (an uploaded CSV)
+    return build_cube(to_table(df)).to_pandas()
+
+def _fold(frames):
+    # partial cubes (CUBE_DIMENSIONS as strings, emissions_kgco2e, rows) -> one
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return (frame.groupby(CUBE_DIMENSIONS, dropna=False, sort=False, as_index=False)
+                 [["emissions_kgco2e", "rows"]].sum(min_count=1))
+
+def rollup_csv(source, chunksize=CHUNK_ROWS, progress=None):
+    # rollup(from_csv(source)) without holding the activity rows: the CSV is
+    # parsed chunksize rows at a time and each chunk's cube is folded into the
+    # running one, so memory follows the cube, not the file. source is a path
+    # or a seekable binary file (a Streamlit upload); progress(fraction, rows)
+    # is called after every chunk with the share of bytes read so far
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(open(source, "rb")) if isinstance(source, (str, os.PathLike)) else source
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        cube, rows = None, 0
+        # dimensions read as strings: dtypes are inferred per chunk, and a blank
+        # scope would otherwise turn one chunk's 1 into "1.0"
+        for chunk in pd.read_csv(f, chunksize=chunksize, parse_dates=["date"],
+                                 dtype=dict.fromkeys(CUBE_DIMENSIONS, "string")):
+            if "emissions_kgco2e" not in chunk:
+                chunk["emissions_kgco2e"] = chunk["activity_amount"] * chunk["emission_factor_kgco2e_per_unit"]
+            if "month" not in chunk or chunk["month"].isna().all():
+                chunk["month"] = chunk["date"].dt.strftime("%Y-%m")
+            part = pd.DataFrame({d: chunk[d].astype("string") if d in chunk else pd.NA for d in CUBE_DIMENSIONS},
+                                index=chunk.index)
+            part["emissions_kgco2e"] = pd.to_numeric(chunk["emissions_kgco2e"], errors="coerce")
+            part["rows"] = 1
+            cube = _fold([part] if cube is None else [cube, part])
+            rows += len(chunk)
+            if progress:
+                progress(min(f.tell() / size, 1.0) if size else 1.0, rows)
+    if cube is None:
+        cube = pd.DataFrame({c: [] for c in CUBE_DIMENSIONS + ["emissions_kgco2e", "rows"]})
+    cube["rows"] = cube["rows"].astype("int64")
+    return typed(cube.sort_values(CUBE_DIMENSIONS, ignore_index=True))
+
+def _write(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".arrow.tmp")
+    os.close(fd)
+    os.chmod(tmp, 0o644)   # dashboards may run as another user
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def write_store(df, path=STORE_PATH, cube_path=CUBE_PATH):
+    # writes the store and its cube; returns the number of rows in the store
+    table = to_table(df)
+    _write(table, path)
+    _write(build_cube(table), cube_path)
+    return table.num_rows
+
+def open_store(path=STORE_PATH):
+    # the store as an Arrow table backed by a read-only memory map (no copy)
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+def read_frame(path=STORE_PATH):
+    # DataFrame view of the mapped table: numeric columns without nulls stay
+    # zero-copy over the map, strings come back as categoricals
+    return open_store(path).to_pandas(split_blocks=True)
+
+def read_cube(path=CUBE_PATH):
+    return read_frame(path)
+
+def from_csv(path):
+    df = pd.read_csv(path, parse_dates=["date"])
+    if "emissions_kgco2e" not in df:
+        df["emissions_kgco2e"] = df["activity_amount"] * df["emission_factor_kgco2e_per_unit"]
+    return typed(df)
+
+def from_emissions(cursor):
+    # rows of the emissions table (emissions_engine.py) in the store layout
+    from ingest_common import get_pk
+    tp_pk = get_pk(cursor, "time_periods") or "time_period_id"
+    office_pk = get_pk(cursor, "offices") or "office_id"
+    category_pk = get_pk(cursor, "categories") or "category_id"
+    cursor.execute(f"SELECT tp.label, o.office_name, e.scope, c.category_name, e.activity_amount, e.unit, "
+                   f"e.emission_factor, e.source, e.kgco2e FROM emissions e "
+                   f"LEFT JOIN time_periods tp ON e.time_period_id = tp.{tp_pk} "
+                   f"LEFT JOIN offices o ON e.office_id = o.{office_pk} "
+                   f"LEFT JOIN categories c ON e.category_id = c.{category_pk}")
+    df = pd.DataFrame(cursor.fetchall(), columns=["month", "office", "scope", "category", "activity_amount", "unit",
+                                                  "emission_factor_kgco2e_per_unit", "notes", "emissions_kgco2e"])
+    df["scope"] = df["scope"].astype("Int64").astype("string")
+    for c in ("activity_amount", "emission_factor_kgco2e_per_unit", "emissions_kgco2e"):
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    return df
+
+def from_db(cursor):
+    # rows of the emissions table, or of v_fuel_buildings_emissions where there
+    # is none, in the store layout; None if neither exists in this database
+    from ingest_common import get_pk
+    if get_pk(cursor, "emissions") is not None:
+        return from_emissions(cursor)
+    cursor.execute("SELECT COUNT(*) FROM INFORMATION_SCHEMA.VIEWS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'v_fuel_buildings_emissions'")
+    if not cursor.fetchone()[0]:
+        return None
+    tp_pk = get_pk(cursor, "time_periods") or "time_period_id"
+    cursor.execute(f"SELECT f.*, tp.label AS month_year FROM v_fuel_buildings_emissions f "
+                   f"JOIN time_periods tp ON f.time_period_id = tp.{tp_pk}")
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+    out = pd.DataFrame({"month": df["month_year"], "scope": df["scope"].astype(str),
+                        "co2_tonnes": pd.to_numeric(df["co2_tonnes"], errors="coerce")})
+    for src, dst in (("office_name", "office"), ("category_name", "category"), ("consumption", "activity_amount"),
+                     ("unit", "unit"), ("fuel_type", "notes")):
+        if src in df:
+            out[dst] = df[src]
+    if "category" not in out:
+        out["category"] = "Fuel - Buildings"
+    if "activity_amount" in out:
+        out["activity_amount"] = pd.to_numeric(out["activity_amount"], errors="coerce")
+    return out
+
+def refresh_from_db(cursor, path=STORE_PATH, cube_path=CUBE_PATH):
+    # rebuilds the store and cube from the DB (see from_db); returns rows
+    # written, None if there is nothing to read
+    df = from_db(cursor)
+    if df is None:
+        return None
+    return write_store(df, path, cube_path)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build the shared emissions store for the dashboards.")
+    ap.add_argument("csv", nargs="?", help="build from this CSV (sample layout) instead of the DB")
+    ap.add_argument("--out", default=STORE_PATH)
+    ap.add_argument("--cube-out", default=CUBE_PATH)
+    args = ap.parse_args(argv)
+    if args.csv:
+        n = write_store(from_csv(args.csv), args.out, args.cube_out)
+    else:
+        from ingest_common import connect
+        conn = connect()
+        try:
+            n = refresh_from_db(conn.cursor(), args.out, args.cube_out)
+        finally:
+            conn.close()
+        if n is None:
+            raise SystemExit("no emissions table or v_fuel_buildings_emissions; pass a CSV instead")
+    print(f"📦 {args.out}: {n} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
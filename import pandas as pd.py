@@ -1,11 +1,12 @@
 import pandas as pd
-import mysql.connector
 import os
+from bulk_writer import write_rows
+from ingest_common import DB, connect, nullify
 
 # --- SETTINGS ---
 excel_file = "your_file.xlsm"        # Excel file path
 sheet_name = "Sheet1"                # Change if needed
-database = "carbon_emissions"        # Existing database
+database = DB["database"]            # Existing database (connection settings: ingest_common.DB)
 
 # Use filename (without extension) as table name
 table_name = os.path.splitext(os.path.basename(excel_file))[0]
@@ -13,13 +14,8 @@ table_name = os.path.splitext(os.path.basename(excel_file))[0]
 # --- STEP 1: Read the Excel sheet ---
 df = pd.read_excel(excel_file, sheet_name=sheet_name)
 
-# --- STEP 2: Connect to MySQL ---
-conn = mysql.connector.connect(
-    host="localhost",         # or your server IP
-    user="root",         # your MySQL username
-    password="Nor@eb@ng99", # your MySQL password
-    database=database         # connect directly to carbon_emissions
-)
+# --- STEP 2: Connect to MySQL (shared pool, see ingest_common.connect) ---
+conn = connect()
 cursor = conn.cursor()
 
 # --- STEP 3: Create table dynamically ---
@@ -33,12 +29,8 @@ CREATE TABLE IF NOT EXISTS `{table_name}` (
 """
 cursor.execute(create_table_query)
 
-# --- STEP 4: Insert the Excel data ---
-placeholders = ", ".join(["%s"] * len(df.columns))
-insert_query = f"INSERT INTO `{table_name}` ({', '.join(df.columns)}) VALUES ({placeholders})"
-
-for _, row in df.iterrows():
-    cursor.execute(insert_query, tuple(row))
+# --- STEP 4: Insert the Excel data (multi-row INSERTs, see bulk_writer.py) ---
+write_rows(cursor, table_name, list(df.columns), nullify(df).itertuples(index=False, name=None))
 
 conn.commit()
 conn.close()
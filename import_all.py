@@ -0,0 +1,284 @@
+# import_all.py
+# Batch loader: walks Data/<Branch>/*.xlsm and loads every sheet registered in
+# sheet_registry.py from every workbook in one run, one transaction per workbook.
+#
+#   python import_all.py                                # everything under Data/
+#   python import_all.py --office "Head Office" --year 2025
+#   python import_all.py --dry-run                      # parse only, no DB writes
+#   python import_all.py -j 0                           # parse on every core
+#   python import_all.py -j 4 --writers 2               # two DB connections writing
+#   python import_all.py --upsert --office "Zamboanga Branch"   # reload corrected workbooks in place
+#   python import_all.py --incremental                  # nightly: only what changed since last load
+#   python import_all.py --tables refrigerants,water_in,water_out
+#   python import_all.py --metrics ingest.prom --metrics-format prom   # per-stage timings, see ingest_metrics.py
+#
+# Extracted tables are kept as Parquet in staging/ (see staging.py), so a
+# workbook is only parsed again once its content changes. After a load the
+# emissions table is recomputed from the Emission_Factors sheets (see
+# emissions_engine.py) and the dashboards' emissions store rebuilt (see
+# emissions_store.py).
+import argparse
+import datetime
+import glob
+import os
+import re
+import sys
+
+from bulk_writer import CHUNK_SIZE
+from emissions_engine import run as compute_emissions
+from emissions_store import refresh_from_db
+from ingest_common import MAX_POOL_SIZE, connect, ensure_table, ensure_unique_key, is_retryable, savepoint
+from ingest_engine import write_batch
+from ingest_manifest import bump_data_version, ensure_manifest, is_unchanged, load_manifest
+from ingest_manifest import record as record_manifest
+from ingest_metrics import WorkbookMetrics, collect, counting, stage, write_jsonl, write_prometheus
+from ingest_metrics import totals as stage_totals
+from ingest_pipeline import QUEUE_SIZE, RETRIES, Dimensions
+from ingest_pipeline import run as run_pipeline
+from sheet_registry import REGISTRY, REGISTRY_BY_NAME
+from staging import STAGING_DIR, prune as prune_staging
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data")
+
+# folder name -> offices.office_name, where the two differ
+OFFICE_ALIASES = {
+    "CDO Branch": "Cagayan De Oro Branch",
+    "SLRO": "South Luzon Regional Office",
+}
+
+# --- discovery ---
+def workbook_years(filename):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    m = re.search(r"(?<!\d)(20\d{2})(?!\d)", stem)
+    if m:
+        return [int(m.group(1))]
+    m = re.match(r"(\d{2})(\d{2})_", stem)  # e.g. 2425_Tugue.xlsm covers 2024 and 2025
+    if m:
+        return [2000 + int(m.group(1)), 2000 + int(m.group(2))]
+    return []
+
+def discover_workbooks(data_dir, office=None, year=None):
+    for path in sorted(glob.glob(os.path.join(data_dir, "*", "*.xlsm"))):
+        name = os.path.basename(path)
+        if name.startswith("~$"):  # Excel lock files
+            continue
+        folder = os.path.basename(os.path.dirname(path))
+        office_name = OFFICE_ALIASES.get(folder, folder)
+        years = workbook_years(name)
+        if office and office not in (folder, office_name):
+            continue
+        if year and year not in years:
+            continue
+        yield path, office_name, years
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load every branch workbook under Data/ into MySQL.")
+    ap.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    ap.add_argument("--office", help="only load this office (folder or office name)")
+    ap.add_argument("--year", type=int, help="only load workbooks for this reporting year")
+    ap.add_argument("-j", "--workers", type=int, default=1,
+                    help="parse workbooks in N processes (0 = one per CPU)")
+    ap.add_argument("--writers", type=int, default=1,
+                    help="DB writer threads, each with its own connection and transaction "
+                         f"(at most {MAX_POOL_SIZE - 2})")
+    ap.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                    help="parsed workbooks waiting for a writer before parsing pauses")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per multi-row INSERT")
+    ap.add_argument("--local-infile", action="store_true",
+                    help="use LOAD DATA LOCAL INFILE for large tables (server needs local_infile=ON)")
+    ap.add_argument("--upsert", action="store_true",
+                    help="re-import mode: update rows in place on their natural key instead of appending")
+    ap.add_argument("--dedupe", action="store_true",
+                    help="with --upsert: delete duplicate rows left by earlier runs before adding the unique keys")
+    ap.add_argument("--incremental", action="store_true",
+                    help="skip workbooks and tables unchanged since the last load (implies --upsert)")
+    ap.add_argument("--tables", help="comma-separated registry entries to load (default: all), "
+                                     "e.g. fuel_buildings,electricity")
+    ap.add_argument("--staging-dir", default=STAGING_DIR,
+                    help="Parquet staging cache of extracted tables (default: ./staging)")
+    ap.add_argument("--no-staging", action="store_true", help="always parse the .xlsm, skip the staging cache")
+    ap.add_argument("--dry-run", action="store_true", help="parse workbooks without touching the DB")
+    ap.add_argument("--metrics", help="write per-stage timings and counts per workbook and table to this file")
+    ap.add_argument("--metrics-format", choices=["jsonl", "prom"], default="jsonl",
+                    help="jsonl: append JSON lines; prom: replace with a Prometheus text file")
+    args = ap.parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    # the pool also holds this run's own connection and Dimensions'
+    if not 1 <= args.writers <= MAX_POOL_SIZE - 2:
+        ap.error(f"--writers must be between 1 and {MAX_POOL_SIZE - 2}")
+
+    if args.incremental:
+        args.upsert = True
+    names = [n.strip() for n in args.tables.split(",")] if args.tables else None
+    unknown = [n for n in names or () if n not in REGISTRY_BY_NAME]
+    if unknown:
+        raise SystemExit(f"Unknown tables: {unknown}. Registered: {list(REGISTRY_BY_NAME)}")
+    entries = [REGISTRY_BY_NAME[n] for n in names] if names else REGISTRY
+    workbooks = list(discover_workbooks(args.data_dir, args.office, args.year))
+    if not workbooks:
+        raise SystemExit(f"No workbooks found under {args.data_dir}")
+
+    conn = cur = None
+    manifest = {}
+    if not args.dry_run:
+        # this connection, Dimensions' and one per writer (--writers is capped to fit)
+        conn = connect(local_infile=args.local_infile, pool_size=args.writers + 2)
+        cur = counting(conn.cursor())
+        for db_table in dict.fromkeys(e["db_table"] for e in entries):
+            ensure_table(cur, db_table)
+            if args.upsert:
+                ensure_unique_key(cur, db_table, dedupe=args.dedupe)
+        ensure_manifest(cur)
+        conn.commit()
+        if args.incremental:
+            manifest = load_manifest(cur)
+
+    # (path, office, years, known table hashes, staging); unchanged files are dropped here
+    todo, stats, skipped = [], {}, 0
+    for path, office_name, years in workbooks:
+        name = os.path.relpath(path, args.data_dir)
+        st = os.stat(path)
+        stats[path] = (st.st_size, st.st_mtime)
+        entry = manifest.get(name)
+        if args.incremental and is_unchanged(entry, st.st_size, st.st_mtime):
+            skipped += 1
+            continue
+        staging_to = None if args.no_staging else (args.staging_dir, name, office_name)
+        todo.append((path, office_name, years, entry["tables"] if entry else None, staging_to))
+    if skipped:
+        print(f"⏭️  {skipped} unchanged workbooks skipped")
+
+    dims = None if args.dry_run else Dimensions(lambda: connect(local_infile=args.local_infile))
+    def load(path, name, office_name, batches, wconn, wcur):
+        # one transaction for the workbook, one savepoint per table: a table that
+        # fails is rolled back on its own and left out of the manifest, the rest
+        # is committed; returns (rows loaded, failed tables)
+        loaded = 0
+        loaded_tables, bad = [], []
+        # only a load of every registered table and year may record the file's
+        # size and mtime, or --incremental would skip the rest for good
+        partial = names is not None and set(names) != set(REGISTRY_BY_NAME)
+        office_id = dims.office(office_name) if dims is not None else None
+        if dims is not None and office_id is None:
+            raise ValueError(f"Office '{office_name}' not found in offices table")
+        for entry_name, year, source, digest, df in batches:
+            if args.year and year != args.year:
+                partial = True
+                continue
+            entry = REGISTRY_BY_NAME[entry_name]
+            if df is None:
+                print(f"   {name} / {entry_name} ({year}): unchanged")
+                loaded_tables.append((source, digest, None))
+                continue
+            if args.dry_run or df.empty:
+                n = len(df)
+            else:
+                try:
+                    with savepoint(wcur):
+                        n = write_batch(wcur, dims, entry, df, office_id, dims.category(entry), year,
+                                        chunk_size=args.chunk_size, local_infile=args.local_infile,
+                                        upsert=args.upsert, source=source)
+                except Exception as e:
+                    if is_retryable(e):
+                        raise
+                    print(f"❌ {name} / {entry_name} ({year}): {e}")
+                    bad.append(f"{name} / {entry_name} ({year})")
+                    continue
+            print(f"   {name} / {entry_name} ({year}): {n} rows")
+            loaded_tables.append((source, digest, len(df)))
+            loaded += n
+        if wconn is not None:
+            # without the file's size and mtime the next --incremental run opens
+            # the workbook again and loads the failed or filtered-out tables
+            complete = not bad and not partial
+            with stage("manifest"):
+                record_manifest(wcur, name, *(stats[path] if complete else (None, None)), loaded_tables,
+                                complete=complete)
+            with stage("commit"):
+                wconn.commit()
+        return loaded, bad
+
+    def write(path, office_name, batches, error, metrics):
+        name = os.path.relpath(path, args.data_dir)
+        metrics = metrics or WorkbookMetrics(name)
+        metrics.workbook = name
+        all_metrics.append(metrics)
+        with collect(name, metrics):
+            return write_workbook(path, name, office_name, batches, error)
+
+    def write_workbook(path, name, office_name, batches, error):
+        # runs on a writer thread: loads one parsed workbook on a pooled
+        # connection and commits it with its manifest rows; returns
+        # (name, rows loaded, failed tables), rows None if nothing was committed
+        wconn = wcur = None
+        try:
+            if error is not None:
+                raise error
+            if dims is not None:
+                wconn = connect(local_infile=args.local_infile)
+                wcur = counting(wconn.cursor())
+            for attempt in range(RETRIES + 1):
+                try:
+                    loaded, bad = load(path, name, office_name, batches, wconn, wcur)
+                    break
+                except Exception as e:
+                    if attempt == RETRIES or not is_retryable(e):
+                        raise
+                    wconn.rollback()
+                    print(f"🔁 {name}: {e}; retrying")
+            print(f"{'⚠️ ' if bad else '✅'} {name}: {loaded} rows (office: {office_name})")
+            return name, loaded, bad
+        except Exception as e:
+            if wconn is not None:
+                wconn.rollback()
+            print(f"❌ {name}: {e}")
+            return name, None, [name]
+        finally:
+            if wconn is not None:
+                wcur.close()
+                wconn.close()
+
+    all_metrics = []
+    results = run_pipeline(todo, write, names, workers, args.writers, args.queue_size)
+    if dims is not None:
+        dims.close()
+    failed = [f for _, _, bad in results for f in bad]
+    total = sum(loaded for _, loaded, _ in results if loaded)
+
+    if conn is not None:
+        with collect(None) as run_metrics:
+            if total:
+                with stage("emissions") as s:
+                    n, missing = compute_emissions(cur, [(path, years) for path, _, years in
+                                                         discover_workbooks(args.data_dir)],
+                                                   chunk_size=args.chunk_size, local_infile=args.local_infile)
+                    s.rows = n
+                print(f"🧮 emissions: {n} rows ({missing} without a factor)")
+                bump_data_version(cur)
+                with stage("commit"):
+                    conn.commit()
+            with stage("store") as s:
+                n = s.rows = refresh_from_db(cur)
+            if n is not None:
+                print(f"📦 emissions store: {n} rows")
+        all_metrics.append(run_metrics)
+        cur.close()
+        conn.close()
+    if not args.no_staging:
+        prune_staging(args.staging_dir)
+
+    print("⏱️  " + ", ".join(f"{s} {v:.2f}s" for s, v in stage_totals(all_metrics).items()))
+    if args.metrics:
+        if args.metrics_format == "prom":
+            write_prometheus(args.metrics, all_metrics)
+        else:
+            write_jsonl(args.metrics, all_metrics, run=datetime.datetime.now().isoformat(timespec="seconds"))
+    complete = sum(1 for _, loaded, bad in results if loaded is not None and not bad)
+    print(f"🎉 Done. {total} rows from {complete}/{len(todo)} workbooks.")
+    if failed:
+        print("Failed:", ", ".join(failed))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
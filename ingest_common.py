@@ -0,0 +1,360 @@
+# ingest_common.py
+# Helpers shared by the Excel -> MySQL importers (import_excel*.py, import_all.py).
+import calendar
+import contextlib
+import datetime
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+import mysql.connector
+from mysql.connector import pooling
+
+from sheet_registry import amount_columns, db_tables, table_ddl, unique_key
+
+# ---------- CONFIG ----------
+DB = {
+    "host": "localhost",
+    "user": "root",
+    "password": "Nor@eb@ng99",
+    "database": "carbon_emissions"
+}
+POOL_SIZE = 5
+MAX_POOL_SIZE = pooling.CNX_POOL_MAXSIZE   # connector limit on a pool's size
+# ----------------------------
+
+MONTH_MAP = {
+    "jan":1, "january":1,
+    "feb":2, "february":2,
+    "mar":3, "march":3,
+    "apr":4, "april":4,
+    "may":5,
+    "jun":6, "june":6,
+    "jul":7, "july":7,
+    "aug":8, "august":8,
+    "sep":9, "sept":9, "september":9,
+    "oct":10, "october":10,
+    "nov":11, "november":11,
+    "dec":12, "december":12
+}
+
+# fact tables and their natural keys come from the sheet registry; the upsert
+# (re-import) mode keys on UNIQUE_KEYS. NULLs never collide in a MySQL unique
+# key, so text key columns are stored as ''
+TABLE_DDL = {t: table_ddl(t) for t in db_tables()}
+UNIQUE_KEYS = {t: unique_key(t) for t in db_tables()}
+ID_KEY_COLUMNS = ("office_id", "time_period_id", "reporting_year", "category_id")
+
+# --- cleaning ---
+def clean(val):
+    if val is None or (isinstance(val, float) and math.isnan(val)):
+        return None
+    if isinstance(val, str):
+        v = val.strip()
+        return None if v.lower() in ("", "nan", "none") else v
+    return val
+
+def to_float(val):
+    val = clean(val)
+    if val is None:
+        return None
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+def nullify(df):
+    # NaN -> None, numpy scalars -> python, so rows can go straight to the driver
+    return df.astype(object).where(pd.notnull(df), None)
+
+def normalize_colname(s):
+    return "" if s is None else str(s).strip().lower().replace(".", "").replace(" ", "_")
+
+def column_finder(columns):
+    # returns fc(*candidates) -> first matching real column name, or None
+    cols_norm = {normalize_colname(c): c for c in columns}
+    def fc(*candidates):
+        for cand in candidates:
+            nc = normalize_colname(cand)
+            if nc in cols_norm:
+                return cols_norm[nc]
+        return None
+    return fc
+
+def parse_month(raw):
+    raw = clean(raw)
+    if raw is None:
+        return None
+    if isinstance(raw, (datetime.date, datetime.datetime)):
+        return raw.month
+    if isinstance(raw, (int, float)):
+        m = int(raw)
+        return m if 1 <= m <= 12 else None
+    s = str(raw).strip().lower().replace(".", "")
+    if s.isdigit():
+        m = int(s)
+        return m if 1 <= m <= 12 else None
+    return MONTH_MAP.get(s[:3]) or MONTH_MAP.get(s)
+
+# --- column-wise cleaning (whole DataFrames/Series at once, see ingest_engine.prepare) ---
+_DATE_MONTH_RE = r"^\d{4}-(\d{2})-\d{2}"
+_QUARTER_RE = r"^(?:Q|QTR|QUARTER)?([1-4])(?:\.0)?(?:ST|ND|RD|TH)?(?:Q|QTR|QUARTER)?$"
+
+def clean_values(obj):
+    # clean() for a whole DataFrame or Series: strings stripped, blank / "nan" /
+    # "none" -> None; everything comes back as object dtype
+    return (obj.astype(object)
+               .replace(r"^\s+|\s+$", "", regex=True)
+               .replace(r"(?i)^(nan|none)?$", None, regex=True))
+
+def numeric_column(s):
+    # to_float() for a cleaned Series -> float64, anything non-numeric NaN
+    return pd.to_numeric(s, errors="coerce").astype("float64")
+
+def month_column(s):
+    # parse_month() for a cleaned Series -> nullable Int64 month numbers
+    key = s.astype(str).str.lower()
+    months = key.str.replace(".", "", regex=False).str[:3].map(MONTH_MAP)
+    rest = months.isna() & s.notna()
+    if rest.any():   # numbers, "03", dates
+        number = np.trunc(pd.to_numeric(s[rest], errors="coerce").astype("float64"))
+        from_date = pd.to_numeric(key[rest].str.extract(_DATE_MONTH_RE, expand=False), errors="coerce")
+        months[rest] = number.where(number.between(1, 12)).fillna(from_date)
+    return months.astype("Int64")
+
+def quarter_column(s):
+    # cleaned "Q1", "q1", 1, "1st Quarter", "Quarter 1" -> "Q1"; anything else kept as is
+    key = s.astype(str).str.upper().str.replace(r"\s+", "", regex=True)
+    n = key.str.extract(_QUARTER_RE, expand=False)
+    return ("Q" + n).where(n.notna(), s).astype(object)
+
+QUARTER_KEY = 20   # period key of quarter n: year * 100 + QUARTER_KEY + n
+
+def period_keys(year, months, quarters):
+    # integer time period key per row (see TimePeriodCache): year * 100 + month
+    # when the month is known, else year * 100 + 20 + n for quarter "Qn", else NA;
+    # year is a scalar or a Series
+    year = pd.Series(year, index=months.index).astype("Int64")
+    q = quarters.astype(str).str.extract(r"^Q([1-4])$", expand=False)
+    q = pd.to_numeric(q, errors="coerce").astype("Int64")
+    return (year * 100 + months.astype("Int64")).fillna(year * 100 + QUARTER_KEY + q)
+
+# --- Excel ---
+def frame_from_rows(rows):
+    # header row + data rows (any iterable, e.g. XlsxWorkbook.iter_rows) -> DataFrame, blank rows dropped
+    rows = iter(rows)
+    headers = next(rows, None)
+    if headers is None:
+        return pd.DataFrame()
+    values = [r for r in rows if any(c not in (None, "") for c in r)]
+    return pd.DataFrame(values, columns=headers)
+
+def read_table(ws, table_name):
+    # rows of a named table on an openpyxl worksheet as a DataFrame
+    return frame_from_rows([c.value for c in r] for r in ws[ws.tables[table_name].ref])
+
+# --- DB ---
+SCHEMA_TABLES = ("offices", "categories", "time_periods") + tuple(db_tables())
+
+class SchemaCache:
+    # primary keys, column names and types from INFORMATION_SCHEMA, read with one
+    # query for all SCHEMA_TABLES the first time any of them is asked for and then
+    # kept for the process until invalidate() (ensure_table, or after DDL / a
+    # migration); shared by every connection and writer thread, hence the lock
+    def __init__(self, tables=SCHEMA_TABLES):
+        self.tables = tuple(tables)
+        self._schema = {}   # table -> {"pk": name or None, "columns": {name: data_type}}
+        self._lock = threading.Lock()
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._schema.clear()
+            else:
+                self._schema.pop(table, None)
+
+    def _load(self, cursor, tables):
+        cursor.execute("SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_KEY FROM INFORMATION_SCHEMA.COLUMNS "
+                       f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({','.join(['%s'] * len(tables))}) "
+                       "ORDER BY TABLE_NAME, ORDINAL_POSITION", tuple(tables))
+        found = {t: {"pk": None, "columns": {}} for t in tables}   # missing tables are cached too
+        for table, column, data_type, key in cursor.fetchall():
+            entry = found.setdefault(table, {"pk": None, "columns": {}})
+            entry["columns"][column] = data_type
+            if key == "PRI" and entry["pk"] is None:
+                entry["pk"] = column
+        return found
+
+    def table(self, cursor, table):
+        with self._lock:
+            entry = self._schema.get(table)
+            if entry is None:
+                wanted = [t for t in self.tables if t not in self._schema]
+                found = self._load(cursor, wanted if table in wanted else [table])
+                self._schema.update(found)
+                entry = found[table]
+        return entry
+
+    def pk(self, cursor, table):
+        return self.table(cursor, table)["pk"]
+
+    def columns(self, cursor, table):
+        return self.table(cursor, table)["columns"]
+
+schema = SchemaCache()
+
+def invalidate_schema(table=None):
+    # call after running a migration against the connected database
+    schema.invalidate(table)
+
+# --- connections ---
+_pools = {}
+_pools_lock = threading.Lock()
+
+def connect(local_infile=False, pool_size=POOL_SIZE):
+    # a connection from the process-wide pool; close() hands it back instead of
+    # disconnecting. local_infile=True allows bulk_writer's LOAD DATA LOCAL
+    # INFILE path and has a pool of its own. pool_size only counts for the call
+    # that creates the pool, so a loader running N connections at once should
+    # ask for them on its first connect()
+    with _pools_lock:
+        pool = _pools.get(local_infile)
+        if pool is None:
+            pool = _pools[local_infile] = pooling.MySQLConnectionPool(
+                pool_name=f"carbon_emissions{'_infile' if local_infile else ''}",
+                pool_size=max(1, min(pool_size, pooling.CNX_POOL_MAXSIZE)),
+                **DB, allow_local_infile=local_infile)
+    return pool.get_connection()
+
+# concurrent upserts into the same fact table can deadlock on InnoDB gap
+# locks; the server then rolls back the whole transaction, which can simply
+# be run again
+RETRY_ERRNOS = {1205, 1213}   # lock wait timeout, deadlock
+
+def is_retryable(e):
+    return getattr(e, "errno", None) in RETRY_ERRNOS
+
+@contextlib.contextmanager
+def savepoint(cursor, name="sheet"):
+    # one table of a workbook's transaction: on error only its rows are rolled
+    # back (ROLLBACK TO SAVEPOINT) and the error re-raised. After a deadlock the
+    # server has already rolled back everything, savepoint included
+    cursor.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except Exception as e:
+        if not is_retryable(e):
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        raise
+    cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+def get_pk(cursor, table):
+    return schema.pk(cursor, table)
+
+def ensure_table(cursor, table):
+    # creates the table, and widens amount columns created with an older, narrower type
+    cursor.execute(TABLE_DDL[table])
+    amounts = amount_columns(table)
+    if amounts:
+        cursor.execute("SELECT COLUMN_NAME, COLUMN_TYPE FROM INFORMATION_SCHEMA.COLUMNS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+                       f"AND COLUMN_NAME IN ({','.join(['%s'] * len(amounts))})", (table, *amounts))
+        for column, column_type in cursor.fetchall():
+            if column_type.lower() != amounts[column].lower():
+                cursor.execute(f"ALTER TABLE {table} MODIFY {column} {amounts[column]}")
+    schema.invalidate(table)
+
+class TimePeriodCache:
+    # time_periods held in memory for a whole run: loaded with one SELECT and
+    # looked up by period key (see period_keys: one per month, and one per
+    # quarter for rows that only carry a quarter); missing periods are inserted
+    # together with a single executemany per batch of rows
+    def __init__(self, cursor):
+        self.pk = get_pk(cursor, 'time_periods') or 'time_period_id'
+        self.reload(cursor)
+
+    def reload(self, cursor, years=None):
+        # call with no years after a rollback: drops ids that were never committed
+        sql = f"SELECT {self.pk}, year, quarter, month, label FROM time_periods"
+        if years:
+            sql += f" WHERE year IN ({','.join(['%s'] * len(years))})"
+        else:
+            self.by_key = {}
+        cursor.execute(sql, tuple(years or ()))
+        tp = pd.DataFrame(cursor.fetchall(), columns=["id", "year", "quarter", "month", "label"])
+        if tp.empty:
+            return
+        tp[["quarter", "month", "label"]] = clean_values(tp[["quarter", "month", "label"]])
+        year = pd.to_numeric(tp["year"], errors="coerce")
+        months = month_column(tp["month"]).where(year.notna())
+        quarters = quarter_column(tp["quarter"])
+        label = tp["label"].astype(str).str.extract(r"^(\d{4})-(\d{2})$").apply(pd.to_numeric)
+        no_month = pd.Series(pd.NA, index=tp.index, dtype="Int64")
+        # "YYYY-MM" labels win over year/month matches; a quarter key takes the
+        # first period of that quarter
+        for keys in (label[0] * 100 + label[1], period_keys(year, months, quarters),
+                     period_keys(year, no_month, quarters)):
+            for key, tp_id in zip(keys, tp["id"]):
+                if not pd.isna(key):
+                    self.by_key.setdefault(int(key), tp_id)
+
+    @staticmethod
+    def _new_period(key):
+        # (year, quarter, month, label) for a key missing from time_periods
+        year, part = divmod(int(key), 100)
+        if part > QUARTER_KEY:
+            return year, f"Q{part - QUARTER_KEY}", None, None
+        return year, f"Q{(part - 1) // 3 + 1}", calendar.month_name[part], f"{year}-{part:02d}"
+
+    def resolve(self, cursor, keys):
+        # period keys (Series) -> time_period_id per row (Int64, NA where the key is NA)
+        ids = keys.map(self.by_key)
+        missing = keys[ids.isna() & keys.notna()].unique()
+        if len(missing):
+            cursor.executemany("INSERT INTO time_periods (year, quarter, month, label) VALUES (%s,%s,%s,%s)",
+                               [self._new_period(k) for k in missing])
+            self.reload(cursor, sorted({int(k) // 100 for k in missing}))
+            ids = keys.map(self.by_key)
+        return ids.astype("Int64")
+
+def ensure_unique_key(cursor, table, dedupe=False):
+    # adds UNIQUE KEY uq_<table> on UNIQUE_KEYS[table] if it is not there yet;
+    # dedupe=True first deletes older copies of rows appended by earlier re-runs
+    name = f"uq_{table}"
+    cursor.execute("SELECT 1 FROM INFORMATION_SCHEMA.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME=%s AND INDEX_NAME=%s LIMIT 1", (table, name))
+    if cursor.fetchone():
+        return
+    keys = UNIQUE_KEYS[table]
+    for c in keys:
+        if c not in ID_KEY_COLUMNS:
+            cursor.execute(f"UPDATE {table} SET {c}='' WHERE {c} IS NULL")
+    if dedupe:
+        on = " AND ".join(f"a.{c} <=> b.{c}" for c in keys)
+        cursor.execute(f"DELETE a FROM {table} a JOIN {table} b ON {on} AND a.id < b.id")
+        print(f"🧹 Removed {cursor.rowcount} duplicate rows from {table}")
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD UNIQUE KEY {name} ({','.join(keys)})")
+    except mysql.connector.Error as e:
+        if e.errno == 1062:   # ER_DUP_ENTRY
+            raise SystemExit(f"{table} already holds duplicate rows, so its unique key cannot be added. "
+                             "Re-run with --dedupe to drop the older copies first.")
+        raise
+    schema.invalidate(table)
+
+def get_or_create_category(cursor, category_name, description):
+    pk = get_pk(cursor, 'categories') or 'category_id'
+    cursor.execute(f"SELECT {pk} FROM categories WHERE category_name=%s", (category_name,))
+    r = cursor.fetchone()
+    if r:
+        return r[0]
+    cursor.execute("INSERT INTO categories (category_name, description) VALUES (%s,%s)",
+                   (category_name, description))
+    return cursor.lastrowid
+
+def get_office_id(cursor, office_name):
+    pk = get_pk(cursor, 'offices') or 'office_id'
+    cursor.execute(f"SELECT {pk} FROM offices WHERE office_name=%s", (office_name,))
+    r = cursor.fetchone()
+    return r[0] if r else None
@@ -0,0 +1,263 @@
+# ingest_engine.py
+# Generic Excel -> MySQL loader driven by sheet_registry.REGISTRY.
+#
+# extract_workbook() finds every registered table in a workbook and maps it to
+# a typed DataFrame of its DB columns; write_batch() resolves time periods and
+# sends the rows through bulk_writer. Cleaning, type coercion, period lookup and
+# duplicate merging are all column operations on the DataFrame. import_all.py runs this over all of Data/, load_file() over a
+# single workbook (the import_excel*.py scripts).
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import staging
+from bulk_writer import CHUNK_SIZE, write_rows
+from ingest_common import (ID_KEY_COLUMNS, UNIQUE_KEYS, clean_values, column_finder, connect, ensure_table,
+                           ensure_unique_key, frame_from_rows, get_office_id, get_or_create_category,
+                           month_column, nullify, numeric_column, period_keys, quarter_column,
+                           savepoint, TimePeriodCache)
+from ingest_manifest import bump_data_version, ensure_manifest, table_hash
+from ingest_metrics import stage
+from sheet_registry import REGISTRY, REGISTRY_BY_NAME, id_columns
+from units import to_base
+from xlsx_tables import XlsxWorkbook
+
+NUMERIC_TYPES = ("number", "int")
+COLUMN_DTYPES = {"text": "string", "number": "float64", "int": "Int64"}
+
+def sheet_year(title, years):
+    m = re.search(r"\((20\d{2})\)", title)
+    if m:
+        return int(m.group(1))
+    return years[0] if len(years) == 1 else None
+
+def find_table(names, table_name):
+    names = list(names)
+    if table_name in names:
+        return table_name
+    # copies of a sheet get suffixed table names (Fuel_Blg15, Electricity12, ...)
+    prefixed = [n for n in names if n.startswith(table_name)]
+    if prefixed:
+        return prefixed[0]
+    return names[0] if len(names) == 1 else None
+
+def numeric_columns(entry):
+    return [c["name"] for c in entry["columns"] if c["type"] in NUMERIC_TYPES]
+
+def prepare(entry, df):
+    # sheet DataFrame -> typed DataFrame of the entry's DB columns, in registry
+    # order: text is "string", numbers float64 (Int64 for "int"), blanks NA/NaN,
+    # quarters "Qn", and defaults fill columns the sheet does not have as well
+    # as blank cells, so a row keys the same either way; amounts with a unit
+    # column are converted to their base unit; rows with nothing in any of the
+    # sheet's columns (template rows) are dropped
+    fc = column_finder(df.columns)
+    found = {c["name"]: fc(*c["aliases"]) for c in entry["columns"]}
+    missing = [c["name"] for c in entry["columns"] if c["required"] and found[c["name"]] is None]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}. Detected: {list(df.columns)}")
+    raw = clean_values(df[list(dict.fromkeys(src for src in found.values() if src is not None))])
+    out = {}
+    for c in entry["columns"]:
+        src = found[c["name"]]
+        if src is None:
+            s = pd.Series(c["default"], index=df.index, dtype=COLUMN_DTYPES[c["type"]])
+        elif c["type"] == "int":
+            s = np.trunc(numeric_column(raw[src]))
+        elif c["type"] in NUMERIC_TYPES:
+            s = numeric_column(raw[src])
+        elif c["name"] == "quarter":
+            s = quarter_column(raw[src])
+        else:
+            s = raw[src]
+        out[c["name"]] = s.astype(COLUMN_DTYPES[c["type"]])
+    for c in entry["columns"]:
+        if c["unit"]:
+            out[c["name"]], out[c["unit"]] = to_base(out[c["name"]], out[c["unit"]])
+    out = pd.DataFrame(out, index=df.index)
+    from_sheet = [name for name, src in found.items() if src is not None]
+    out = out[out[from_sheet].notna().any(axis=1)]
+    defaults = {c["name"]: c["default"] for c in entry["columns"]
+                if c["default"] is not None and found[c["name"]] is not None}
+    return out.fillna(defaults) if defaults else out
+
+def row_periods(entry, df, year):
+    # period key per row (see ingest_common.period_keys): the first period
+    # column holding a month, with the (already normalized) quarter as fallback
+    first, *rest = entry["period"]
+    months = month_column(df[first])
+    for c in rest:
+        months = months.fillna(month_column(df[c]))
+    quarters = df["quarter"] if "quarter" in df else pd.Series(None, index=df.index, dtype=object)
+    return period_keys(year, months, quarters)
+
+def extract_workbook(path, years, known=None, entries=REGISTRY):
+    # yields (entry, year, source, digest, DataFrame) for every registered table
+    # in the workbook; only the named tables are streamed out of the file (see
+    # xlsx_tables.py). known = {source: digest} from the ingest manifest: tables
+    # whose content hash matches are yielded with df=None and not parsed further
+    known = known or {}
+    with stage("open", nbytes=os.path.getsize(path)):
+        wb = XlsxWorkbook(path)
+    with wb:
+        for entry in entries:
+            for title, tables in wb.sheets.items():
+                if not title.startswith(entry["sheet"]):
+                    continue
+                year = sheet_year(title, years)
+                if year is None:
+                    print(f"⚠️  {os.path.basename(path)} / {title}: cannot infer reporting year, skipped")
+                    continue
+                table_name = find_table(tables, entry["table"])
+                if table_name is None:
+                    print(f"⚠️  {os.path.basename(path)} / {title}: no '{entry['table']}' table, skipped")
+                    continue
+                source = f"{title}/{table_name}"
+                with stage("read", source, wb.zf.getinfo(tables[table_name].sheet_part).compress_size) as s:
+                    raw = list(wb.iter_rows(tables[table_name]))
+                    s.rows = len(raw) - 1
+                with stage("hash", source):
+                    digest = table_hash(raw)
+                if known.get(source) == digest:
+                    yield entry, year, source, digest, None
+                    continue
+                with stage("frame", source) as s:
+                    df = frame_from_rows(raw)
+                    s.rows = len(df)
+                if df.empty:
+                    yield entry, year, source, digest, df
+                    continue
+                with stage("prepare", source) as s:
+                    df = prepare(entry, df)
+                    if entry["period"]:
+                        # a monthly table needs a month or quarter to file the row under
+                        placed = row_periods(entry, df, year).notna()
+                        if not placed.all():
+                            print(f"⚠️  {os.path.basename(path)} / {source}: "
+                                  f"{(~placed).sum()} rows without month/quarter skipped")
+                            df = df[placed]
+                    s.rows = len(df)
+                yield entry, year, source, digest, df
+
+def parse_workbook(path, years, known=None, names=None, staging_to=None):
+    # worker entry point: parses one workbook into picklable batches
+    # [(entry name, year, source, digest, DataFrame)] for the single writer
+    # process; the DataFrame is None for tables that have not changed.
+    # staging_to = (staging dir, workbook name, office) reads/writes the
+    # Parquet staging cache (staging.py) instead of always parsing the .xlsm
+    if staging_to is None:
+        entries = [REGISTRY_BY_NAME[n] for n in names] if names else REGISTRY
+        return [(entry["name"], year, source, digest, df)
+                for entry, year, source, digest, df in extract_workbook(path, years, known, entries)]
+    known = known or {}
+    return [(entry_name, year, source, digest, None if known.get(source) == digest else df)
+            for entry_name, year, source, digest, df in staged_batches(path, years, *staging_to, known)
+            if not names or entry_name in names]
+
+def staged_batches(path, years, staging_dir, name, office, known=None):
+    # every registered table of the workbook, from the staging cache when this
+    # exact file content has been extracted before. Otherwise only the tables
+    # that changed are prepared: ones whose digest matches the workbook's
+    # previously staged version are copied from it, and ones the manifest
+    # (known) already has are staged without data (DataFrame None)
+    with stage("staging", nbytes=os.path.getsize(path)) as s:
+        sha = staging.file_hash(path)
+        batches = staging.read(staging_dir, sha, years, known)
+        s.rows = sum(len(df) for *_, df in batches if df is not None) if batches is not None else None
+    if batches is None:
+        prev = staging.previous(staging_dir, name, years)
+        skip = {**(known or {}), **{source: digest for source, (digest, _) in prev.items()}}
+        batches = []
+        for entry, year, source, digest, df in extract_workbook(path, years, skip):
+            if df is None and source in prev and prev[source][0] == digest:
+                df = staging.read_file(prev[source][1])
+            batches.append((entry["name"], year, source, digest, df))
+        staging.write(staging_dir, sha, years, batches)
+    staging.point(staging_dir, name, office, sha)
+    return batches
+
+def merge_duplicates(df, key_columns, sum_columns):
+    # rows sharing a natural key (e.g. two vans on the same fuel in one month)
+    # become one row with their amounts summed, so an upsert keeps the total;
+    # NULL text key columns become '' so they match the unique key
+    key_columns = list(key_columns)
+    text_keys = [c for c in key_columns if c not in ID_KEY_COLUMNS]
+    df = df.copy()
+    df[text_keys] = df[text_keys].astype(object).where(df[text_keys].notna(), "")
+    groups = df.groupby(key_columns, sort=False, dropna=False)
+    if groups.ngroups == len(df):
+        return df
+    other = [c for c in df.columns if c not in key_columns and c not in sum_columns]
+    merged = pd.concat([groups[sum_columns].sum(min_count=1), groups[other].first()], axis=1)
+    return merged.reset_index()[list(df.columns)]
+
+def write_batch(cur, tp_cache, entry, df, office_id, category_id, year,
+                chunk_size=CHUNK_SIZE, local_infile=False, upsert=False, source=None):
+    # df: a prepared batch from extract_workbook/parse_workbook; source only
+    # labels its stages in the metrics (ingest_metrics.py)
+    if entry["period"]:
+        with stage("periods", source) as s:
+            period = tp_cache.resolve(cur, row_periods(entry, df, year))
+            s.rows = len(df)
+    else:
+        period = year
+    with stage("insert", source) as s:
+        s.rows = insert_batch(cur, entry, df, office_id, period, category_id,
+                              chunk_size=chunk_size, local_infile=local_infile, upsert=upsert)
+    return s.rows
+
+def insert_batch(cur, entry, df, office_id, period, category_id,
+                 chunk_size=CHUNK_SIZE, local_infile=False, upsert=False):
+    # the write half of write_batch: period is the resolved time_period_id
+    # Series (or the reporting year of a non-monthly entry); returns rows written
+    ids = pd.DataFrame(dict(zip(id_columns(entry), (office_id, period, category_id))), index=df.index)
+    out = pd.concat([ids, df], axis=1)
+    key_columns = None
+    if upsert:
+        key_columns = UNIQUE_KEYS[entry["db_table"]]
+        out = merge_duplicates(out, key_columns, numeric_columns(entry))
+    return write_rows(cur, entry["db_table"], list(out.columns),
+                      nullify(out).itertuples(index=False, name=None),
+                      chunk_size=chunk_size, local_infile=local_infile, key_columns=key_columns)
+
+def load_file(path, office_name, year, names=None, upsert=False):
+    # loads the registered tables of one workbook (all, or just names) for one
+    # office and year in a single transaction, one savepoint per table; returns
+    # the number of rows written
+    entries = [REGISTRY_BY_NAME[n] for n in names] if names else REGISTRY
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        for db_table in dict.fromkeys(e["db_table"] for e in entries):
+            ensure_table(cur, db_table)
+            if upsert:
+                ensure_unique_key(cur, db_table)
+        ensure_manifest(cur)
+        office_id = get_office_id(cur, office_name)
+        if office_id is None:
+            raise SystemExit(f"Office '{office_name}' not found")
+        tp_cache = TimePeriodCache(cur)
+        total = 0
+        for entry, sheet_yr, source, digest, df in extract_workbook(path, [year], entries=entries):
+            if df.empty:
+                continue
+            try:
+                with savepoint(cur):   # a bad sheet leaves the others in the transaction
+                    category_id = get_or_create_category(cur, entry["category"], entry["description"])
+                    total += write_batch(cur, tp_cache, entry, df, office_id, category_id, sheet_yr,
+                                         upsert=upsert, source=source)
+            except Exception as e:
+                print(f"❌ {entry['name']} ({sheet_yr}): {e}")
+                tp_cache.reload(cur)
+        if total:
+            bump_data_version(cur)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    return total
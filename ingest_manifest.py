@@ -0,0 +1,85 @@
+# ingest_manifest.py
+# Bookkeeping for incremental loads (import_all.py --incremental).
+#
+# ingest_manifest holds one row per (workbook, source table) with the file's
+# size and mtime at load time and a SHA-256 of the table's cell values. A
+# workbook whose size and mtime are unchanged is skipped without being opened;
+# otherwise each named table is hashed and only the ones whose content changed
+# are parsed and upserted. Size and mtime are only recorded by a load that
+# processed every registered table and year of the workbook (no --tables /
+# --year filter, no failed table); a partial load records them as NULL, so the
+# next incremental run opens the file again.
+#
+# data_version is a single counter bumped after every load that wrote rows;
+# the DB dashboards (query_cache.py) drop their cached query results when it
+# changes.
+import hashlib
+
+MANIFEST_DDL = """
+CREATE TABLE IF NOT EXISTS ingest_manifest (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    path VARCHAR(255) NOT NULL,
+    source_table VARCHAR(200) NOT NULL,
+    file_size BIGINT,
+    file_mtime DOUBLE,
+    content_hash CHAR(64),
+    row_count INT,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_ingest_manifest (path, source_table)
+);"""
+
+DATA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id TINYINT PRIMARY KEY,
+    version INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);"""
+
+def ensure_manifest(cursor):
+    cursor.execute(MANIFEST_DDL)
+    cursor.execute(DATA_VERSION_DDL)
+
+def table_hash(rows):
+    # rows as streamed by XlsxWorkbook.iter_rows, header included
+    h = hashlib.sha256()
+    for row in rows:
+        h.update(repr(row).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+def load_manifest(cursor):
+    # {path: {"tables": {source_table: content_hash}, "files": {source_table: (size, mtime)}}}
+    cursor.execute("SELECT path, source_table, file_size, file_mtime, content_hash FROM ingest_manifest")
+    out = {}
+    for path, source, size, mtime, digest in cursor.fetchall():
+        entry = out.setdefault(path, {"tables": {}, "files": {}})
+        entry["tables"][source] = digest
+        entry["files"][source] = (size, mtime)
+    return out
+
+def is_unchanged(entry, size, mtime):
+    # every registered source of the workbook has a row, and all of them were
+    # written by a complete load of this size and mtime (record() drops rows
+    # of sources a complete load no longer found)
+    return (entry is not None and bool(entry["files"])
+            and all(f == (size, mtime) for f in entry["files"].values()))
+
+def record(cursor, path, size, mtime, tables, complete=False):
+    # tables: [(source_table, content_hash, row_count)]; row_count None = unchanged table.
+    # complete: tables is every registered source of the workbook
+    if not tables:
+        return
+    if complete:
+        cursor.execute(f"DELETE FROM ingest_manifest WHERE path = %s AND source_table NOT IN "
+                       f"({','.join(['%s'] * len(tables))})", (path, *(source for source, _, _ in tables)))
+    cursor.executemany(
+        "INSERT INTO ingest_manifest (path, source_table, file_size, file_mtime, content_hash, row_count) "
+        "VALUES (%s,%s,%s,%s,%s,%s) ON DUPLICATE KEY UPDATE file_size=VALUES(file_size), "
+        "file_mtime=VALUES(file_mtime), content_hash=VALUES(content_hash), "
+        "row_count=COALESCE(VALUES(row_count), row_count), "
+        "loaded_at=CURRENT_TIMESTAMP",
+        [(path, source, size, mtime, digest, n) for source, digest, n in tables])
+
+def bump_data_version(cursor):
+    cursor.execute("INSERT INTO data_version (id, version) VALUES (1, 1) "
+                   "ON DUPLICATE KEY UPDATE version = version + 1")
@@ -0,0 +1,170 @@
+# ingest_metrics.py
+# Per-stage timings and counters for the ingest path.
+#
+# A WorkbookMetrics collects, for one workbook and each of its tables (the
+# "Sheet/Table" source; None for the workbook as a whole), the seconds spent in
+# every stage, the rows a stage produced, the DB round trips (execute /
+# executemany calls) and the bytes read. The loaders mark their stages with
+#
+#   with stage("prepare", source) as s:
+#       df = prepare(entry, df)
+#       s.rows = len(df)
+#
+# which records into the WorkbookMetrics installed on the current thread by
+# collect(), and does nothing when there is none (load_file, the dashboards).
+# Cursors wrapped in counting() add their calls to the table of the stage they
+# run in. WorkbookMetrics pickle, so a parse worker process hands its part
+# back with the parsed batches and the writer thread carries on with it.
+#
+# import_all.py --metrics PATH writes them as JSON lines (one per workbook and
+# table) or, with --metrics-format prom, as a Prometheus text file for the
+# node_exporter textfile collector.
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+STAGES = ["open", "staging", "read", "hash", "frame", "prepare", "periods", "insert", "manifest", "commit",
+          "emissions", "store"]
+
+_local = threading.local()
+
+class WorkbookMetrics:
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.tables = {}   # table -> {"seconds": {stage: s}, "rows": {stage: n}, "round_trips": n, "bytes": n}
+
+    def _table(self, table):
+        return self.tables.setdefault(table, {"seconds": {}, "rows": {}, "round_trips": 0, "bytes": 0})
+
+    def add(self, table, stage=None, seconds=0.0, rows=None, round_trips=0, nbytes=0):
+        t = self._table(table)
+        if stage is not None:
+            t["seconds"][stage] = t["seconds"].get(stage, 0.0) + seconds
+            if rows is not None:
+                t["rows"][stage] = t["rows"].get(stage, 0) + rows
+        t["round_trips"] += round_trips
+        t["bytes"] += nbytes
+
+    def records(self):
+        # one flat dict per table, workbook-level entry first
+        out = []
+        for table, t in sorted(self.tables.items(), key=lambda kv: (kv[0] is not None, kv[0] or "")):
+            out.append({"workbook": self.workbook, "table": table,
+                        "seconds": {s: round(v, 6) for s, v in t["seconds"].items()},
+                        "rows": t["rows"], "round_trips": t["round_trips"], "bytes": t["bytes"]})
+        return out
+
+def current():
+    return getattr(_local, "metrics", None)
+
+@contextlib.contextmanager
+def collect(workbook, metrics=None):
+    # installs a WorkbookMetrics (a new one, or metrics carried over from the
+    # parse step) on this thread for the duration of the block
+    previous = current()
+    _local.metrics = metrics if metrics is not None else WorkbookMetrics(workbook)
+    try:
+        yield _local.metrics
+    finally:
+        _local.metrics = previous
+
+@contextlib.contextmanager
+def stage(name, table=None, nbytes=0):
+    # times the block as stage name of table; set .rows on the yielded object
+    # to record the rows it produced
+    metrics = current()
+    s = SimpleNamespace(rows=None)
+    if metrics is None:
+        yield s
+        return
+    outer = getattr(_local, "table", None)
+    _local.table = table
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        metrics.add(table, name, time.perf_counter() - start, s.rows, nbytes=nbytes)
+        _local.table = outer
+
+def count_round_trip():
+    metrics = current()
+    if metrics is not None:
+        metrics.add(getattr(_local, "table", None), round_trips=1)
+
+class CountingCursor:
+    # DB cursor proxy that counts execute / executemany calls as round trips
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        count_round_trip()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        count_round_trip()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+def counting(cursor):
+    return CountingCursor(cursor)
+
+# --- output ---
+def totals(all_metrics):
+    # seconds per stage summed over every workbook and table
+    out = {}
+    for m in all_metrics:
+        for t in m.tables.values():
+            for s, v in t["seconds"].items():
+                out[s] = out.get(s, 0.0) + v
+    return {s: out[s] for s in STAGES if s in out}
+
+def _write_atomic(path, text):
+    # a scraper never sees a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+def write_jsonl(path, all_metrics, run=None):
+    # appends one JSON line per workbook and table; run (e.g. a timestamp) tags the lines of one load
+    with open(path, "a", encoding="utf-8") as f:
+        for m in all_metrics:
+            for r in m.records():
+                f.write(json.dumps({"run": run, **r}) + "\n")
+
+def _labels(**labels):
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+def write_prometheus(path, all_metrics):
+    # replaces path with the metrics of the last load in the Prometheus text format
+    lines = [
+        "# HELP ingest_stage_seconds Wall time spent in an ingest stage.",
+        "# TYPE ingest_stage_seconds gauge",
+    ]
+    rows, trips, nbytes = [], [], []
+    for m in all_metrics:
+        for r in m.records():
+            base = dict(workbook=r["workbook"] or "", table=r["table"] or "")
+            for s, v in r["seconds"].items():
+                lines.append(f"ingest_stage_seconds{_labels(**base, stage=s)} {v}")
+            rows += [f"ingest_rows{_labels(**base, stage=s)} {n}" for s, n in r["rows"].items()]
+            if r["round_trips"]:
+                trips.append(f"ingest_db_round_trips{_labels(**base)} {r['round_trips']}")
+            if r["bytes"]:
+                nbytes.append(f"ingest_bytes_read{_labels(**base)} {r['bytes']}")
+    lines += ["# HELP ingest_rows Rows produced by an ingest stage.", "# TYPE ingest_rows gauge", *rows,
+              "# HELP ingest_db_round_trips DB statements sent.", "# TYPE ingest_db_round_trips gauge", *trips,
+              "# HELP ingest_bytes_read Bytes of workbook data read.", "# TYPE ingest_bytes_read gauge", *nbytes,
+              "# HELP ingest_last_run_timestamp_seconds When these metrics were written.",
+              "# TYPE ingest_last_run_timestamp_seconds gauge",
+              f"ingest_last_run_timestamp_seconds {time.time():.0f}"]
+    _write_atomic(path, "\n".join(lines) + "\n")
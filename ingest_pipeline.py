@@ -0,0 +1,103 @@
+# ingest_pipeline.py
+# Parse / write pipeline behind import_all.py.
+#
+# Workbooks are parsed in an executor (a process pool with -j N, otherwise one
+# background thread) and handed to DB writer threads through a bounded asyncio
+# queue, so the next workbook is being parsed while the previous one is being
+# inserted and committed. A parser keeps its slot until the queue accepts its
+# result: when the writers fall behind the queue fills up and parsing stops,
+# so at most queue_size + workers parsed workbooks are held in memory.
+#
+# Each workbook is written in one transaction on a connection from the pool
+# (ingest_common.connect), so several writers each work in their own; offices,
+# categories and time periods are shared through Dimensions, which creates
+# them on a separate connection and commits them at once, so every writer
+# sees the same ids whatever happens to its own transaction.
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ingest_common import get_office_id, get_or_create_category, TimePeriodCache
+from ingest_engine import parse_workbook
+from ingest_metrics import collect, counting
+
+QUEUE_SIZE = 4
+RETRIES = 2
+
+def parse_item(item, names=None):
+    # item: (path, office_name, years, known, staging_to) as built by import_all;
+    # -> (batches, WorkbookMetrics of the parse stages)
+    path, office_name, years, known, staging_to = item
+    with collect(path) as metrics:
+        return parse_workbook(path, years, known, names, staging_to), metrics
+
+class Dimensions:
+    def __init__(self, connect):
+        self.conn = connect()
+        self.cur = counting(self.conn.cursor())
+        self.lock = threading.Lock()
+        self.periods = TimePeriodCache(self.cur)
+        self.offices = {}
+        self.categories = {}
+
+    def office(self, office_name):
+        with self.lock:
+            if office_name not in self.offices:
+                self.offices[office_name] = get_office_id(self.cur, office_name)
+            return self.offices[office_name]
+
+    def category(self, entry):
+        with self.lock:
+            if entry["category"] not in self.categories:
+                self.categories[entry["category"]] = get_or_create_category(
+                    self.cur, entry["category"], entry["description"])
+                self.conn.commit()
+            return self.categories[entry["category"]]
+
+    def resolve(self, cursor, keys):
+        # TimePeriodCache.resolve for write_batch; cursor (the writer's) is not used
+        with self.lock:
+            ids = self.periods.resolve(self.cur, keys)
+            self.conn.commit()
+            return ids
+
+    def close(self):
+        self.cur.close()
+        self.conn.close()
+
+async def _run(items, write, names, workers, writers, queue_size):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    slots = asyncio.Semaphore(workers)
+    results = []
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(1)) as parse_pool, \
+         ThreadPoolExecutor(max_workers=writers, thread_name_prefix="writer") as write_pool:
+
+        async def parse(item):
+            async with slots:
+                try:
+                    batches, metrics = await loop.run_in_executor(parse_pool, parse_item, item, names)
+                    await queue.put((item, batches, None, metrics))
+                except Exception as e:
+                    await queue.put((item, None, e, None))
+
+        async def produce():
+            await asyncio.gather(*(parse(item) for item in items))
+            for _ in range(writers):
+                await queue.put(None)
+
+        async def consume():
+            while (job := await queue.get()) is not None:
+                item, batches, error, metrics = job
+                results.append(await loop.run_in_executor(write_pool, write, item[0], item[1], batches, error,
+                                                          metrics))
+
+        await asyncio.gather(produce(), *(consume() for _ in range(writers)))
+    return results
+
+def run(items, write, names=None, workers=1, writers=1, queue_size=QUEUE_SIZE):
+    # items: import_all's (path, office_name, years, known, staging_to);
+    # write(path, office_name, batches, error, metrics) runs on a writer thread
+    # for each workbook in the order parsing finishes, metrics being the
+    # WorkbookMetrics of its parse; returns the list of its results
+    return asyncio.run(_run(items, write, names, max(workers, 1), max(writers, 1), max(queue_size, 1)))
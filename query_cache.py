@@ -0,0 +1,109 @@
+# query_cache.py
+# Cached MySQL reads for the DB dashboards (scrollytelling2.py).
+#
+# get_engine() is one pooled SQLAlchemy engine per Streamlit process, built
+# from st.secrets["mysql"]. read_sql() memoizes query results by SQL text and
+# parameters for every session of the process: entries expire after TTL
+# seconds, the least recently used ones are evicted past MAX_ENTRIES, and the
+# whole cache is dropped as soon as data_version (bumped by the importers, see
+# ingest_manifest.py) changes. data_version itself is read at most once every
+# VERSION_CHECK seconds, so clicking around the sidebar does not hit MySQL.
+#
+# Results are shared between sessions: treat them as read-only.
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote_plus
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from dashboard_profile import loader
+
+TTL = 600
+MAX_ENTRIES = 256
+VERSION_CHECK = 15
+
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    try:
+        db = st.secrets["mysql"]
+    except Exception:
+        st.error("Database credentials not found in st.secrets['mysql']. Create .streamlit/secrets.toml.")
+        raise
+
+    user = db.get("user") or db.get("username") or db.get("uname")
+    raw_pwd = db.get("password") or db.get("pw") or ""
+    host = db.get("host", "localhost")
+    port = db.get("port", 3306)
+    database = db.get("database") or db.get("db") or db.get("dbname")
+
+    pwd = quote_plus(raw_pwd)  # URL-encode
+    conn_str = f"mysql+pymysql://{user}:{pwd}@{host}:{port}/{database}"
+    return create_engine(conn_str, pool_size=5, max_overflow=5, pool_recycle=3600, pool_pre_ping=True)
+
+def _freeze(params):
+    # hashable form of read_sql params (lists for expanding IN parameters)
+    return tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple)) else v)
+                        for k, v in (params or {}).items()))
+
+class QueryCache:
+    def __init__(self, ttl=TTL, max_entries=MAX_ENTRIES, version_check=VERSION_CHECK):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check = version_check
+        self.version = None
+        self._checked = float("-inf")
+        self._entries = OrderedDict()  # key -> (expires at, DataFrame)
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def check_version(self, engine):
+        # re-reads data_version when due; drops everything if it moved
+        now = time.monotonic()
+        if now - self._checked < self.version_check:
+            return
+        self._checked = now
+        try:
+            with engine.connect() as conn:
+                version = conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+        except SQLAlchemyError:  # no load has run against this database yet
+            version = None
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def read_sql(self, engine, sql, params=None):
+        self.check_version(engine)
+        key = (str(sql), _freeze(params))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] > now:
+                self._entries.move_to_end(key)
+                return hit[1]
+        df = _query(engine, sql, params)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return df
+
+@loader
+def _query(engine, sql, params):
+    # a cache miss (counted by dashboard_profile)
+    return pd.read_sql(sql, engine, params=params)
+
+@st.cache_resource(show_spinner=False)
+def get_cache():
+    return QueryCache()
+
+def read_sql(sql, params=None):
+    # pd.read_sql through the process-wide engine and cache
+    return get_cache().read_sql(get_engine(), sql, params)
@@ -5,43 +5,62 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sqlalchemy import create_engine
-from urllib.parse import quote_plus
+from sqlalchemy import bindparam, text
+
+from dashboard_data import load_cube
+from dashboard_profile import begin, report, section
+from query_cache import read_sql
+from sheet_registry import REGISTRY_BY_NAME
 
 st.set_page_config(page_title="Carbon Emissions (DB)", layout="wide")
+begin("scrollytelling2")
 
 # ---------------------------
-# Database connection (uses st.secrets["mysql"])
-def get_engine():
-    try:
-        db = st.secrets["mysql"]
-    except Exception:
-        st.error("Database credentials not found in st.secrets['mysql']. Create .streamlit/secrets.toml.")
-        raise
-
-    user = db.get("user") or db.get("username") or db.get("uname")
-    raw_pwd = db.get("password") or db.get("pw") or ""
-    host = db.get("host", "localhost")
-    port = db.get("port", 3306)
-    database = db.get("database") or db.get("db") or db.get("dbname")
-
-    pwd = quote_plus(raw_pwd)  # URL-encode
-    conn_str = f"mysql+pymysql://{user}:{pwd}@{host}:{port}/{database}"
-    return create_engine(conn_str, pool_pre_ping=True)
-
-# --- Initialize engine ---
-engine = get_engine()
-
-# --- Load data with time_periods.label for month/year ---
-query = """
-SELECT 
-    f.*, 
-    tp.label AS month_year
+# Database access: a pooled engine per process and cached query results
+# (query_cache.py, uses st.secrets["mysql"])
+# --- Queries: everything below is filtered and summed in MySQL, only one row
+# per (month, scope) comes back ---
+SOURCE = """
 FROM v_fuel_buildings_emissions f
 JOIN time_periods tp 
     ON f.time_period_id = tp.period_id
 """
-df = pd.read_sql(query, engine)
+
+def filter_options():
+    # distinct scopes and month labels for the sidebar
+    scopes = read_sql(text(f"SELECT DISTINCT f.scope {SOURCE} ORDER BY f.scope"))
+    months = read_sql(text(f"SELECT DISTINCT tp.label AS month_year {SOURCE} ORDER BY tp.label"))
+    return scopes["scope"].tolist(), months["month_year"].tolist()
+
+def monthly_totals(scopes, months):
+    # co2_tonnes per (month_year, scope) for the selected scopes and months
+    if not scopes or not months:
+        return pd.DataFrame({"month_year": [], "scope": [], "co2_tonnes": []})
+    query = text(f"""
+    SELECT 
+        tp.label AS month_year,
+        f.scope,
+        SUM(f.co2_tonnes) AS co2_tonnes
+    {SOURCE}
+    WHERE f.scope IN :scopes AND tp.label IN :months
+    GROUP BY tp.label, f.scope
+    """).bindparams(bindparam("scopes", expanding=True), bindparam("months", expanding=True))
+    return read_sql(query, {"scopes": list(scopes), "months": list(months)})
+
+# --- Load data: the rollup cube of the shared store (emissions_store.py) when
+# it has been built, otherwise the view (time_periods.label for month/year).
+# The cube holds every category; this page keeps to the view's fuel - buildings ---
+FUEL_BUILDINGS = REGISTRY_BY_NAME["fuel_buildings"]["category"]
+
+with section("load data", cached=True):
+    cube = load_cube()
+    if cube is not None:
+        cube = cube[cube["category"] == FUEL_BUILDINGS].rename(columns={"month": "month_year"})
+        cube["co2_tonnes"] = cube["emissions_kgco2e"] / 1000
+        scope_options = sorted(cube["scope"].dropna().unique())
+        month_options = sorted(cube["month_year"].dropna().unique())
+    else:
+        scope_options, month_options = filter_options()
 
 # ---------------------------
 # Filters (Dropdowns but multi-select)
@@ -50,21 +69,25 @@ st.sidebar.header("Filters")
 
 scope_filter = st.sidebar.multiselect(
     "Select Scope(s):",
-    options=df["scope"].unique(),
-    default=df["scope"].unique()
+    options=scope_options,
+    default=scope_options
 )
 
 month_filter = st.sidebar.multiselect(
     "Select Month/Year(s):",
-    options=df["month_year"].unique(),
-    default=df["month_year"].unique()
+    options=month_options,
+    default=month_options
 )
 
 # Apply filters
-df_filtered = df[
-    (df["scope"].isin(scope_filter)) &
-    (df["month_year"].isin(month_filter))
-]
+with section("filter"):
+    if cube is not None:
+        df_filtered = cube[
+            (cube["scope"].isin(scope_filter)) &
+            (cube["month_year"].isin(month_filter))
+        ]
+    else:
+        df_filtered = monthly_totals(scope_filter, month_filter)
 
 # --- KPIs ---
 c1, c2, c3 = st.columns(3)
@@ -73,10 +96,14 @@ c2.metric("Scopes Covered", f"{df_filtered['scope'].nunique()}")
 c3.metric("Months Covered", f"{df_filtered['month_year'].nunique()}")
 
 # --- Aggregation by month for charts ---
-by_month = (
-    df_filtered.groupby("month_year", as_index=False)
-               .agg({"co2_tonnes": "sum"})
-               .sort_values("month_year")
-)
+with section("groupby"):
+    by_month = (
+        df_filtered.groupby("month_year", as_index=False, observed=True)
+                   .agg({"co2_tonnes": "sum"})
+                   .sort_values("month_year")
+    )
+
+with section("trend chart"):
+    st.line_chart(by_month.set_index("month_year")["co2_tonnes"])
 
-st.line_chart(by_month.set_index("month_year")["co2_tonnes"])
+report()
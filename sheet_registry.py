@@ -0,0 +1,190 @@
+# sheet_registry.py
+# What to load from each sheet of the branch data-collection workbook.
+#
+# One entry per named Excel table. The generic engine in ingest_engine.py
+# finds the sheet (by title prefix, so "2.1a Fuel - Buildings (2025)" also
+# matches), picks the table, maps headers to DB columns through the aliases
+# below, coerces types, fills defaults and writes the rows to db_table.
+# Adding a sheet means adding an entry here, nothing else.
+#
+# entry keys:
+#   name         unique id, used on the command line (import_all.py --tables)
+#   sheet        sheet title prefix
+#   table        Excel table name (tables copied with a sheet get a numeric
+#                suffix, e.g. Fuel_Blg15, which still matches)
+#   db_table     target table; several entries may share one (water_in/out)
+#   category     categories.category_name the rows are filed under
+#   description  categories.description when the category is created
+#   columns      col(...) specs, in DB column order
+#   period       columns whose first non-empty value is the month used for
+#                time_period_id (quarter is the fallback); None = the table is
+#                not monthly and rows carry reporting_year instead
+#   key          columns that, with office/period/category, identify a row
+#                for the upsert mode (ingest_common.ensure_unique_key)
+
+SQL_TYPES = {"text": "VARCHAR(100)", "number": "DECIMAL(12,2)", "int": "INT"}
+# amounts converted to their base unit: 2 decimals would round 5 g (0.005 kg)
+# or 5 mL (0.005 L) to 0.01
+AMOUNT_SQL = "DECIMAL(18,6)"
+
+def col(name, *aliases, type="text", sql=None, required=False, default=None, unit=None):
+    # required: the header must exist; default: value used when the column is
+    # missing from the sheet or empty in a row (ingest_engine.prepare); unit: for an amount, the
+    # column holding its unit; both are converted to the base unit at load
+    # (units.py: L, kg, kWh, km) and stored as AMOUNT_SQL
+    return {"name": name, "aliases": (name,) + aliases, "type": type,
+            "sql": sql or (AMOUNT_SQL if unit else SQL_TYPES[type]), "required": required, "default": default,
+            "unit": unit}
+
+MONTH = col("month", "Month", sql="VARCHAR(20)", required=True)
+QUARTER = col("quarter", "Quarter", "qtr", sql="VARCHAR(10)", required=True)
+FACILITY = col("facility_type", "Facility Type", "Facility", default="Office")
+
+REGISTRY = [
+    {"name": "fuel_buildings", "sheet": "2.1a Fuel - Buildings", "table": "Fuel_Blg",
+     "db_table": "fuel_buildings", "category": "Fuel - Buildings",
+     "description": "Fuel consumption for buildings/stationary sources",
+     "columns": [FACILITY,
+                 col("fuel_type", "Fuel Type", "Fuel", required=True),
+                 MONTH, QUARTER,
+                 col("consumption", "Consumption", "amount", "value", type="number", required=True, unit="unit"),
+                 col("unit", "Unit", sql="VARCHAR(20)", required=True)],
+     "period": ["month"], "key": ["facility_type", "fuel_type"]},
+
+    {"name": "fuel_vehicles", "sheet": "2.1b Fuel - Vehicles", "table": "Fuel_Veh",
+     "db_table": "fuel_vehicles", "category": "Fuel - Vehicles",
+     "description": "Fuel consumption for vehicles",
+     "columns": [FACILITY,
+                 col("vehicle_type", "Vehicle Type", "Vehicle", required=True),
+                 col("fuel_type", "Fuel Type", "Fuel", required=True),
+                 MONTH, QUARTER,
+                 col("consumption", "Consumption", "amount", "value", type="number", required=True, unit="unit"),
+                 col("unit", "Unit", sql="VARCHAR(20)", required=True),
+                 col("total_kilometers_travelled", "Total Kilometers Travelled",
+                     "Total kilometers travelled (all vehicles)", "KM Travelled",
+                     type="number", required=True, unit="unit2"),
+                 col("unit2", "Unit2", sql="VARCHAR(20)", required=True)],
+     "period": ["month"], "key": ["facility_type", "vehicle_type", "fuel_type"]},
+
+    {"name": "refrigerants", "sheet": "2.2 Refrigerants", "table": "Refrigerants",
+     "db_table": "refrigerants", "category": "Refrigerants",
+     "description": "Refrigerant charges, recharges and disposals",
+     "columns": [FACILITY,
+                 col("location", "Location"),
+                 col("equipment_category", "Equipment Category", sql="VARCHAR(150)", required=True),
+                 col("no_of_units", "No. of Units", "Units", type="int"),
+                 col("refrigerant", "Refrigerant", "Refrigerant Type", sql="VARCHAR(50)", required=True),
+                 col("equipment_status", "Equipment Status", "Status"),
+                 col("month_purchased", "Month Purchased", sql="VARCHAR(20)"),
+                 col("charge_kg", "Charge (kg)", "Charge", type="number"),
+                 col("month_recharged", "Month Recharged", sql="VARCHAR(20)"),
+                 col("recharge_kg", "Recharge (kg)", "Recharge", type="number"),
+                 col("month_disposed", "Month Disposed", sql="VARCHAR(20)"),
+                 col("capacity_kg", "Capacity (kg)", "Capacity", type="number"),
+                 col("recovered_kg", "Recovered (kg)", "Recovered", type="number"),
+                 QUARTER],
+     "period": ["month_recharged", "month_purchased", "month_disposed"],
+     "key": ["facility_type", "location", "equipment_category", "refrigerant", "equipment_status"]},
+
+    {"name": "electricity", "sheet": "2.3a Electricity", "table": "Electricity",
+     "db_table": "electricity", "category": "Electricity",
+     "description": "Electricity consumption",
+     "columns": [FACILITY, MONTH, QUARTER,
+                 col("consumption_kwh", "Consumption (kWh)", "consumption", "kwh", type="number", required=True),
+                 col("cost_php", "Cost (PHP)", "cost", "php", type="number", required=True),
+                 col("utility_provider", "Utility Provider", "provider", required=True)],
+     "period": ["month"], "key": ["facility_type", "utility_provider"]},
+
+    {"name": "re_solar", "sheet": "2.3b RE - Solar", "table": "Electricity6",
+     "db_table": "re_solar", "category": "RE - Solar",
+     "description": "On-site solar generation",
+     "columns": [FACILITY, MONTH, QUARTER,
+                 col("solar_generated_kwh", "Solar Energy Generated (kWh)", "Solar Generated",
+                     type="number", required=True),
+                 col("operational_demand_kwh", "Operational Energy Demand - One Shift (kWH)",
+                     "Operational Energy Demand", type="number")],
+     "period": ["month"], "key": ["facility_type"]},
+
+    {"name": "water_in", "sheet": "2.4 Water", "table": "water_in",
+     "db_table": "water", "category": "Water",
+     "description": "Water withdrawal and discharge",
+     "columns": [FACILITY,
+                 col("direction", sql="VARCHAR(10)", default="in"),
+                 MONTH, QUARTER,
+                 col("source_destination", "Source", "Water Source", required=True),
+                 col("volume_m3", "Volume (m3)", "Volume", type="number", required=True)],
+     "period": ["month"], "key": ["facility_type", "direction", "source_destination"]},
+
+    {"name": "water_out", "sheet": "2.4 Water", "table": "water_out",
+     "db_table": "water", "category": "Water",
+     "description": "Water withdrawal and discharge",
+     "columns": [FACILITY,
+                 col("direction", sql="VARCHAR(10)", default="out"),
+                 MONTH, QUARTER,
+                 col("source_destination", "Water Destination", "Destination", required=True),
+                 col("volume_m3", "Volume2 (m3)", "Volume (m3)", "Volume", type="number", required=True)],
+     "period": ["month"], "key": ["facility_type", "direction", "source_destination"]},
+
+    {"name": "waste", "sheet": "2.5 Waste", "table": "Waste",
+     "db_table": "waste", "category": "Waste",
+     "description": "Solid waste generated",
+     "columns": [FACILITY, MONTH, QUARTER,
+                 col("waste_composition", "Waste Composition", "Composition", required=True),
+                 col("weight_kg", "Weight (kg)", "Weight", type="number", required=True),
+                 col("disposal_method", "Disposal/Recovery Method", "Disposal Method", sql="VARCHAR(150)")],
+     "period": ["month"], "key": ["facility_type", "waste_composition", "disposal_method"]},
+
+    {"name": "waste_gases", "sheet": "2.7 Waste Gases", "table": "Waste_Gases",
+     "db_table": "waste_gases", "category": "Waste Gases",
+     "description": "Waste gas composition used for flaring/venting estimates",
+     "columns": [col("component", "Component", required=True),
+                 col("chemical_formula", "Chemical Formula", sql="VARCHAR(30)"),
+                 col("molar_fraction", "Molar Fraction (%)", type="number", sql="DECIMAL(12,6)"),
+                 col("total_moles", "Total Moles (kg-mole/m3)", type="number", sql="DECIMAL(14,8)"),
+                 col("molecular_weight", "Molecular Weight", type="number", sql="DECIMAL(12,6)"),
+                 col("percent_carbon", "Percent Carbon (%)", type="number", sql="DECIMAL(12,6)"),
+                 col("carbon_content", "Carbon Content(kg/m3)", "Carbon Content (kg/m3)",
+                     type="number", sql="DECIMAL(14,8)")],
+     "period": None, "key": ["component"]},
+]
+
+REGISTRY_BY_NAME = {entry["name"]: entry for entry in REGISTRY}
+
+def entries_for(db_table):
+    return [e for e in REGISTRY if e["db_table"] == db_table]
+
+def find_entry(table_name):
+    # registry entry for an Excel table name (Fuel_Blg, Fuel_Blg15, ...)
+    for entry in REGISTRY:
+        if table_name == entry["table"] or table_name.startswith(entry["table"]):
+            return entry
+    return None
+
+def db_tables():
+    return list(dict.fromkeys(e["db_table"] for e in REGISTRY))
+
+def id_columns(entry):
+    # columns the engine fills in front of the sheet columns
+    period = "time_period_id" if entry["period"] else "reporting_year"
+    return ["office_id", period, "category_id"]
+
+def unique_key(db_table):
+    entry = entries_for(db_table)[0]
+    return tuple(id_columns(entry) + entry["key"])
+
+def amount_columns(db_table):
+    # {column: sql type} of the unit-converted amounts of a DB table
+    return {c["name"]: c["sql"] for entry in entries_for(db_table) for c in entry["columns"] if c["unit"]}
+
+def table_ddl(db_table):
+    entries = entries_for(db_table)
+    cols = {}
+    for entry in entries:
+        for c in entry["columns"]:
+            cols.setdefault(c["name"], c["sql"])
+    id_cols = ["    office_id INT,",
+               "    time_period_id INT," if entries[0]["period"] else "    reporting_year INT,",
+               "    category_id INT,"]
+    body = ",\n".join(f"    {name} {sql}" for name, sql in cols.items())
+    return (f"\nCREATE TABLE IF NOT EXISTS {db_table} (\n"
+            "    id INT AUTO_INCREMENT PRIMARY KEY,\n" + "\n".join(id_cols) + "\n" + body + "\n);")
@@ -0,0 +1,180 @@
+# staging.py
+# Columnar staging cache of the tables extracted from the branch workbooks.
+#
+# The first time a workbook is parsed, every registered table is written as a
+# typed Parquet file (the prepared DataFrame, see ingest_engine.prepare) under
+#
+#   staging/<sha256 of the workbook>/index.json
+#   staging/<sha256 of the workbook>/<n>.parquet
+#
+# Later runs hash the file and, if nothing changed, read the Parquet files in
+# milliseconds instead of going back to the .xlsm. staging/workbooks/ maps each
+# workbook (path under Data/) to the hash of its current version, so checks and
+# dashboards can read the latest tables without opening Excel at all:
+#
+#   from staging import read_table
+#   fuel = read_table("fuel_vehicles", office="Zamboanga Branch")
+#
+# The index records the registry fingerprint; editing sheet_registry.py (or
+# bumping STAGING_VERSION when prepare() changes) re-extracts on the next run.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from urllib.parse import quote
+
+import pandas as pd
+
+from emissions_store import typed
+from sheet_registry import REGISTRY
+
+STAGING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "staging")
+STAGING_VERSION = 2
+POINTERS = "workbooks"
+
+def fingerprint():
+    return hashlib.sha256(repr((STAGING_VERSION, REGISTRY)).encode("utf-8")).hexdigest()[:16]
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _index(staging_dir, sha, years):
+    # index.json of a staged workbook, None if missing or staged by another registry
+    try:
+        with open(os.path.join(staging_dir, sha, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("registry") != fingerprint() or index.get("years") != list(years):
+        return None
+    return index
+
+def read(staging_dir, sha, years, known=None):
+    # staged batches [(entry name, year, source, digest, DataFrame)] for a
+    # workbook hash, or None when it has not been staged. Tables staged
+    # without data (see write) come back as None, and only while known =
+    # {source: digest} from the manifest still vouches for them
+    index = _index(staging_dir, sha, years)
+    if index is None:
+        return None
+    known = known or {}
+    batches = []
+    for t in index["tables"]:
+        if t["rows"] is None:
+            if known.get(t["source"]) != t["digest"]:
+                return None
+            df = None
+        else:
+            df = pd.read_parquet(os.path.join(staging_dir, sha, t["file"])) if t["file"] else pd.DataFrame()
+        batches.append((t["entry"], t["year"], t["source"], t["digest"], df))
+    return batches
+
+def previous(staging_dir, name, years):
+    # {source: (digest, Parquet path or None)} of the tables staged for the
+    # current version of workbook name; a new version copies the tables whose
+    # digest matches instead of preparing them again
+    try:
+        with open(os.path.join(staging_dir, POINTERS, quote(name, safe="") + ".json"), encoding="utf-8") as f:
+            sha = json.load(f)["sha"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    index = _index(staging_dir, sha, years)
+    if index is None:
+        return {}
+    return {t["source"]: (t["digest"], os.path.join(staging_dir, sha, t["file"]) if t["file"] else None)
+            for t in index["tables"] if t["rows"] is not None}
+
+def read_file(path):
+    # one table listed by previous()
+    return pd.read_parquet(path) if path else pd.DataFrame()
+
+def write(staging_dir, sha, years, batches):
+    # written to a temp dir and renamed into place, so a crashed or concurrent
+    # run never leaves a half-written workbook behind. A DataFrame of None (a
+    # table left unparsed because the manifest has it) is recorded without
+    # data; such a partial version is replaced once the workbook is staged in full
+    target = os.path.join(staging_dir, sha)
+    index = _index(staging_dir, sha, years)
+    if index is not None and all(t["rows"] is not None for t in index["tables"]):
+        return
+    os.makedirs(staging_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{sha[:12]}-", dir=staging_dir)
+    try:
+        tables = []
+        for i, (entry_name, year, source, digest, df) in enumerate(batches):
+            name = None
+            if df is not None and not df.empty:
+                name = f"{i}.parquet"
+                df.to_parquet(os.path.join(tmp, name), index=False)
+            tables.append({"entry": entry_name, "year": year, "source": source,
+                           "digest": digest, "file": name, "rows": None if df is None else len(df)})
+        with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"registry": fingerprint(), "years": list(years), "tables": tables}, f, indent=1)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(target):   # lost a race with another worker is fine
+            raise
+
+def point(staging_dir, name, office, sha):
+    # records sha as the current version of workbook name (path under Data/)
+    pointers = os.path.join(staging_dir, POINTERS)
+    os.makedirs(pointers, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=pointers, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"workbook": name, "office": office, "sha": sha}, f)
+    os.replace(tmp, os.path.join(pointers, quote(name, safe="") + ".json"))
+
+def current(staging_dir=STAGING_DIR):
+    # [{"workbook", "office", "sha"}] for every staged workbook
+    pointers = os.path.join(staging_dir, POINTERS)
+    out = []
+    for fn in sorted(os.listdir(pointers)) if os.path.isdir(pointers) else []:
+        if fn.endswith(".json"):
+            with open(os.path.join(pointers, fn), encoding="utf-8") as f:
+                out.append(json.load(f))
+    return out
+
+def read_table(entry_name, staging_dir=STAGING_DIR, office=None, year=None):
+    # one registry entry across the current version of every staged workbook,
+    # with office / workbook / year / source columns in front; labels and
+    # amounts typed as in the store (emissions_store.typed)
+    frames = []
+    for wb in current(staging_dir):
+        if office and wb["office"] != office:
+            continue
+        try:
+            with open(os.path.join(staging_dir, wb["sha"], "index.json"), encoding="utf-8") as f:
+                tables = json.load(f)["tables"]
+        except (OSError, ValueError):
+            continue
+        for t in tables:
+            if t["entry"] != entry_name or not t["file"] or (year and t["year"] != year):
+                continue
+            df = pd.read_parquet(os.path.join(staging_dir, wb["sha"], t["file"]))
+            df.insert(0, "source", t["source"])
+            df.insert(0, "year", t["year"])
+            df.insert(0, "workbook", wb["workbook"])
+            df.insert(0, "office", wb["office"])
+            frames.append(df)
+    return typed(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+
+def prune(staging_dir=STAGING_DIR):
+    # removes staged versions no workbook points at any more; returns how many
+    if not os.path.isdir(staging_dir):
+        return 0
+    live = {wb["sha"] for wb in current(staging_dir)}
+    removed = 0
+    for name in os.listdir(staging_dir):
+        path = os.path.join(staging_dir, name)
+        if name == POINTERS or name in live or not os.path.isdir(path) or name.startswith("."):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
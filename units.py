@@ -0,0 +1,112 @@
+# units.py
+# Unit normalization for the activity tables.
+#
+# The sheets carry free-text units ("Liters", "Litre", "kilometers", "KWH",
+# ...). canonical() maps every distinct spelling to one symbol of UNITS, once
+# per distinct string rather than once per row. Each canonical unit has a row
+# and column in CONVERSION, a precomputed matrix of factors (NaN between units
+# of different dimensions), so converting a whole column is one fancy-indexing
+# lookup and one multiply:
+#
+#   values, units = to_base(df["consumption"], df["unit"])   # -> L / kg / kWh / km
+#   litres = convert(df["consumption"], df["unit"], "L")
+#
+# Units that are not recognised are kept as written (stripped) and their values
+# left unchanged by to_base(); convert() returns NaN for them.
+import numpy as np
+import pandas as pd
+
+# canonical unit -> (dimension, size in the dimension's base unit)
+UNITS = {
+    "L": ("volume", 1.0),
+    "mL": ("volume", 0.001),
+    "m3": ("volume", 1000.0),
+    "gal": ("volume", 3.785411784),
+    "kg": ("mass", 1.0),
+    "g": ("mass", 0.001),
+    "t": ("mass", 1000.0),
+    "lb": ("mass", 0.45359237),
+    "kWh": ("energy", 1.0),
+    "Wh": ("energy", 0.001),
+    "MWh": ("energy", 1000.0),
+    "GJ": ("energy", 1000 / 3.6),
+    "km": ("distance", 1.0),
+    "m": ("distance", 0.001),
+    "mi": ("distance", 1.609344),
+}
+BASE_UNITS = {"volume": "L", "mass": "kg", "energy": "kWh", "distance": "km"}
+
+# lower-case spellings seen in (or expected from) the branch sheets -> canonical unit
+ALIASES = {
+    "l": "L", "lt": "L", "ltr": "L", "ltrs": "L", "liter": "L", "liters": "L", "litre": "L", "litres": "L",
+    "ml": "mL", "milliliter": "mL", "milliliters": "mL", "millilitre": "mL", "millilitres": "mL",
+    "m3": "m3", "m^3": "m3", "m³": "m3", "cu m": "m3", "cubic meter": "m3", "cubic meters": "m3",
+    "cubic metre": "m3", "cubic metres": "m3",
+    "gal": "gal", "gallon": "gal", "gallons": "gal",
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "g": "g", "gram": "g", "grams": "g",
+    "t": "t", "ton": "t", "tons": "t", "tonne": "t", "tonnes": "t", "mt": "t", "metric ton": "t",
+    "metric tons": "t",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "kwh": "kWh", "kw-h": "kWh", "kw h": "kWh", "kilowatt hour": "kWh", "kilowatt hours": "kWh",
+    "kilowatt-hour": "kWh", "kilowatt-hours": "kWh",
+    "wh": "Wh", "mwh": "MWh", "gj": "GJ",
+    "km": "km", "kms": "km", "kilometer": "km", "kilometers": "km", "kilometre": "km", "kilometres": "km",
+    "m": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m",
+    "mi": "mi", "mile": "mi", "miles": "mi",
+}
+
+UNIT_INDEX = {u: i for i, u in enumerate(UNITS)}
+_SIZE = np.array([size for _, size in UNITS.values()])
+_DIM = np.array([dim for dim, _ in UNITS.values()])
+# CONVERSION[i, j]: multiply a value in unit i by this to get unit j
+CONVERSION = np.where(_DIM[:, None] == _DIM[None, :], _SIZE[:, None] / _SIZE[None, :], np.nan)
+# BASE_INDEX[i]: index of unit i's base unit
+BASE_INDEX = np.array([UNIT_INDEX[BASE_UNITS[dim]] for dim in _DIM])
+
+def _canonical_one(unit):
+    text = str(unit).strip()
+    key = " ".join(text.lower().replace(".", "").split())
+    return ALIASES.get(key, text)
+
+def canonical(units):
+    # Series of unit strings -> Series of canonical units (string dtype); NA stays NA
+    units = pd.Series(units)
+    codes, uniques = pd.factorize(units)
+    mapped = np.array([_canonical_one(u) for u in uniques] + [None], dtype=object)
+    return pd.Series(mapped[codes], index=units.index, dtype="string")
+
+def unit_codes(units):
+    # canonical units -> row index into CONVERSION, -1 where unknown or NA
+    codes, uniques = pd.factorize(pd.Series(units))
+    lookup = np.array([UNIT_INDEX.get(u, -1) for u in uniques] + [-1], dtype=np.intp)
+    return lookup[codes]
+
+def convert(values, from_units, to_units):
+    # values in from_units (canonical or free text) -> to_units (one unit or a
+    # Series per row); NaN where a unit is unknown or the dimensions differ
+    values = pd.Series(values)
+    src = unit_codes(canonical(from_units))
+    if isinstance(to_units, str):
+        dst = np.full(len(values), UNIT_INDEX.get(_canonical_one(to_units), -1), dtype=np.intp)
+    else:
+        dst = unit_codes(canonical(to_units))
+    ok = (src >= 0) & (dst >= 0)
+    factor = np.full(len(values), np.nan)
+    factor[ok] = CONVERSION[src[ok], dst[ok]]
+    return pd.Series(pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan) * factor,
+                     index=values.index)
+
+def to_base(values, units):
+    # (values, units) -> the same amounts in the base unit of each row's
+    # dimension (L, kg, kWh, km) and the canonical unit column; unknown units
+    # keep their value and spelling
+    units = canonical(units)
+    src = unit_codes(units)
+    known = src >= 0
+    factor = np.ones(len(units))
+    factor[known] = CONVERSION[src[known], BASE_INDEX[src[known]]]
+    base = units.copy()
+    base[known] = np.array(list(UNITS), dtype=object)[BASE_INDEX[src[known]]]
+    values = pd.to_numeric(pd.Series(values, index=units.index), errors="coerce").astype("float64")
+    return values * factor, base
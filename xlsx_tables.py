@@ -0,0 +1,228 @@
+# xlsx_tables.py
+# Streaming reader for named Excel tables (ListObjects) in .xlsx/.xlsm files.
+#
+# Works on the zip parts directly: the table's range comes from its
+# xl/tables/tableN.xml part, and only the rows of that range are streamed out of
+# the one worksheet XML that holds it. Pivot caches, charts, slicers, styles and
+# every other sheet are never parsed, so memory and time depend on the size of
+# the table, not of the workbook.
+#
+#   with XlsxWorkbook("Data/Head Office/2025_HO-FMED.xlsm") as wb:
+#       tbl = wb.find_table("Fuel_Blg")
+#       for row in wb.iter_rows(tbl):      # header row first, like ws[tbl.ref]
+#           ...
+#
+# Cell values are the cached results, as with load_workbook(data_only=True);
+# numbers with a date format come back as datetimes.
+import datetime
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+REL_TABLE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/table"
+
+Table = namedtuple("Table", "name sheet ref part sheet_part")
+
+_REF_RE = re.compile(r"^\$?([A-Z]+)\$?(\d+)$")
+
+# built-in number formats that display dates/times
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+def col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+def parse_ref(ref):
+    # "I6:O106" -> (min_col, min_row, max_col, max_row), 1-based
+    first, _, last = ref.upper().partition(":")
+    c1, r1 = _REF_RE.match(first).groups()
+    c2, r2 = _REF_RE.match(last or first).groups()
+    return col_index(c1), int(r1), col_index(c2), int(r2)
+
+def _cast_number(text):
+    # same rule as openpyxl: int unless the text has a decimal point or exponent
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+def _is_date_format(code):
+    # date/time codes use d, m, y, h or s outside of quoted text and [..] blocks
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", code).lower()
+    return any(ch in code for ch in "dmyhs")
+
+def from_excel(serial):
+    # serial day number -> datetime, rounded to the millisecond
+    return EXCEL_EPOCH + datetime.timedelta(milliseconds=round(serial * 86400000))
+
+def _rels(zf, part):
+    # {rId: (type, absolute target)} for a part, {} if it has no rels
+    base, name = posixpath.split(part)
+    rels_part = posixpath.join(base, "_rels", name + ".rels")
+    try:
+        root = ET.fromstring(zf.read(rels_part))
+    except KeyError:
+        return {}
+    out = {}
+    for rel in root.iter(NS_PKG + "Relationship"):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(base, target))
+        out[rel.get("Id")] = (rel.get("Type"), target)
+    return out
+
+class XlsxWorkbook:
+    def __init__(self, path):
+        self.path = path
+        self.zf = zipfile.ZipFile(path)
+        self._shared = None
+        self._date_styles = None
+        self.sheets = {}   # sheet title -> {table name: Table}
+        self.sheet_parts = {}   # sheet title -> worksheet part
+        wb_rels = _rels(self.zf, "xl/workbook.xml")
+        root = ET.fromstring(self.zf.read("xl/workbook.xml"))
+        for sh in root.iter(NS_MAIN + "sheet"):
+            rel = wb_rels.get(sh.get(NS_REL + "id"))
+            if rel is None:
+                continue
+            sheet_part = rel[1]
+            tables = {}
+            for rtype, target in _rels(self.zf, sheet_part).values():
+                if rtype != REL_TABLE:
+                    continue
+                t = ET.fromstring(self.zf.read(target))
+                name = t.get("displayName") or t.get("name")
+                tables[name] = Table(name, sh.get("name"), t.get("ref"), target, sheet_part)
+            self.sheets[sh.get("name")] = tables
+            self.sheet_parts[sh.get("name")] = sheet_part
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.zf.close()
+
+    @property
+    def sheetnames(self):
+        return list(self.sheets)
+
+    def tables(self):
+        return [t for tables in self.sheets.values() for t in tables.values()]
+
+    def find_table(self, name):
+        for tables in self.sheets.values():
+            if name in tables:
+                return tables[name]
+        return None
+
+    def range_table(self, sheet, ref):
+        # a plain cell range that is not a named table (e.g. "A1:F40"), readable
+        # with iter_rows like one
+        return Table(None, sheet, ref, None, self.sheet_parts[sheet])
+
+    @property
+    def shared_strings(self):
+        # loaded on first use; one entry per <si>, rich-text runs concatenated
+        if self._shared is None:
+            self._shared = []
+            try:
+                f = self.zf.open("xl/sharedStrings.xml")
+            except KeyError:
+                return self._shared
+            with f:
+                for _, el in ET.iterparse(f):
+                    if el.tag == NS_MAIN + "si":
+                        self._shared.append(_si_text(el))
+                        el.clear()
+        return self._shared
+
+    @property
+    def date_styles(self):
+        # indexes into cellXfs (the s= attribute of a cell) that carry a date format
+        if self._date_styles is None:
+            self._date_styles = set()
+            try:
+                root = ET.fromstring(self.zf.read("xl/styles.xml"))
+            except KeyError:
+                return self._date_styles
+            custom = {int(nf.get("numFmtId")) for nf in root.iter(NS_MAIN + "numFmt")
+                      if _is_date_format(nf.get("formatCode") or "")}
+            xfs = root.find(NS_MAIN + "cellXfs")
+            for i, xf in enumerate(xfs if xfs is not None else []):
+                fmt = int(xf.get("numFmtId") or 0)
+                if fmt in BUILTIN_DATE_FORMATS or fmt in custom:
+                    self._date_styles.add(i)
+        return self._date_styles
+
+    def _value(self, c):
+        t = c.get("t")
+        if t == "inlineStr":
+            return "".join(x.text or "" for x in c.iter(NS_MAIN + "t"))
+        v = c.find(NS_MAIN + "v")
+        if v is None or v.text is None:
+            return None
+        if t == "s":
+            return self.shared_strings[int(v.text)]
+        if t == "b":
+            return v.text == "1"
+        if t in ("str", "e"):
+            return v.text
+        if t == "d":
+            return datetime.datetime.fromisoformat(v.text)
+        value = _cast_number(v.text)
+        if c.get("s") and int(c.get("s")) in self.date_styles:
+            return from_excel(value)
+        return value
+
+    def iter_rows(self, table):
+        # yields one list per row of table.ref (header row included), streaming
+        # the worksheet XML and stopping as soon as the last row has been read
+        min_col, min_row, max_col, max_row = parse_ref(table.ref)
+        width = max_col - min_col + 1
+        next_row = min_row
+        row_num = 0
+        with self.zf.open(table.sheet_part) as f:
+            for _, el in ET.iterparse(f):
+                if el.tag != NS_MAIN + "row":
+                    continue
+                row_num = int(el.get("r") or row_num + 1)
+                if row_num < min_row:
+                    el.clear()
+                    continue
+                if row_num > max_row:
+                    break
+                while next_row < row_num:   # rows with no cells are not written
+                    yield [None] * width
+                    next_row += 1
+                values = [None] * width
+                col = 0
+                for c in el.iter(NS_MAIN + "c"):
+                    r = c.get("r")
+                    col = col_index(_REF_RE.match(r).group(1)) if r else col + 1
+                    if min_col <= col <= max_col:
+                        values[col - min_col] = self._value(c)
+                el.clear()
+                yield values
+                next_row = row_num + 1
+        while next_row <= max_row:
+            yield [None] * width
+            next_row += 1
+
+def _si_text(si):
+    # plain <t>, or the <r> runs of a rich-text string (<rPh> phonetic runs skipped)
+    t = si.find(NS_MAIN + "t")
+    if t is not None:
+        return t.text or ""
+    return "".join(r.findtext(NS_MAIN + "t") or "" for r in si.findall(NS_MAIN + "r"))